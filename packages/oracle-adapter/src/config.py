@@ -35,6 +35,10 @@ class Settings(BaseSettings):
     arbitrum_rpc_url: str = "https://arb1.arbitrum.io/rpc"
     chainlink_oracle_address: Optional[str] = None
     ai_oracle_address: Optional[str] = None
+    oracle_batch_size: int = 20
+    oracle_flush_interval_ms: int = 1000
+    oracle_max_pending: int = 10000  # queued valuations kept during an RPC outage
+    oracle_max_attempts: int = 5
     
     # Model Configuration
     image_model_name: str = "image_fingerprint"
@@ -42,11 +46,18 @@ class Settings(BaseSettings):
     video_model_name: str = "video_fingerprint"
     similarity_model_name: str = "similarity_detection"
     valuation_model_name: str = "valuation_model"
+    valuation_compile_model: bool = False  # torch.compile the valuation network at load
+    valuation_quantize_model: bool = False  # int8 dynamic quantization of the valuation network
+    valuation_train_bf16: bool = False  # bfloat16 autocast for the valuation training loop
+    valuation_onnx_neural: bool = True  # serve the valuation network through ONNX Runtime
     
     # Performance
     max_workers: int = 4
     batch_size: int = 8
     timeout_seconds: int = 30
+    valuation_batch_max_size: int = 32
+    valuation_batch_max_wait_ms: float = 2.0
+    valuation_onnx_threads: int = 1  # intra-op threads per ONNX Runtime session
     
     # Logging
     log_level: str = "INFO"
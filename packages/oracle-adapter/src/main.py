@@ -63,6 +63,9 @@ async def lifespan(app: FastAPI):
     
     # Cleanup
     logger.info("Shutting down Oracle Adapter Service")
+    await fingerprint_service.close()
+    await valuation_service.close()
+    await chainlink_oracle.close()
 
 
 app = FastAPI(
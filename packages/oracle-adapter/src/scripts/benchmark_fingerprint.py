@@ -196,9 +196,9 @@ async def main():
     # Display configuration
     stats = service.get_cache_stats()
     print(f"\nConfiguration:")
-    print(f"  Device: {stats['device']}")
-    print(f"  Image model loaded: {stats['models_loaded']['image']}")
-    print(f"  Cache TTL: {stats['cache_ttl_seconds']}s")
+    print(f"  Device: {stats.device}")
+    print(f"  Image model loaded: {stats.models_loaded['image']}")
+    print(f"  Cache TTL: {stats.cache_ttl_seconds}s")
     
     # Run benchmarks
     try:
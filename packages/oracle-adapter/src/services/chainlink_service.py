@@ -1,15 +1,80 @@
 """Chainlink Oracle Integration Service"""
 
 import structlog
+import orjson
+import requests
 from web3 import Web3
+from web3.types import RPCEndpoint, RPCResponse
 from eth_account import Account
-from typing import Dict, Any, Optional
+from eth_utils import to_hex
+from typing import Dict, Any, List, Optional, Tuple
+from collections.abc import Mapping
+import asyncio
+import re
 import time
 
 from src.config import settings
 
 logger = structlog.get_logger()
 
+# Valuations are submitted with 18 decimals; float inputs are first rounded to
+# 6 decimals so the scaled integer fits the float mantissa exactly
+VALUE_DECIMALS = 18
+FLOAT_DECIMALS = 6
+
+# RPC failures worth retrying on the next flush; anything else is dropped
+TRANSIENT_RPC_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+# Queued valuation: (token_id, estimated_value, confidence_score, metadata, failed attempts)
+PendingValuation = Tuple[str, float, float, Optional[Dict[str, Any]], int]
+
+
+def to_fixed_point(value: float) -> int:
+    """Convert a value to its 18-decimal integer representation without Decimal"""
+    return int(round(value * 10**FLOAT_DECIMALS)) * 10**(VALUE_DECIMALS - FLOAT_DECIMALS)
+
+
+# 20+ digits may be an integer that does not fit in 64 bits
+_LONG_DIGIT_RUN = re.compile(rb"\d{20}")
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Serialize the web3 types orjson does not handle natively"""
+    if isinstance(obj, (bytes, bytearray)):
+        return to_hex(obj)
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonHTTPProvider(Web3.HTTPProvider):
+    """HTTP provider that encodes and decodes JSON-RPC payloads with orjson"""
+    
+    def encode_rpc_request(self, method: RPCEndpoint, params: Any) -> bytes:
+        rpc_dict = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params or [],
+            "id": next(self.request_counter),
+        }
+        try:
+            return orjson.dumps(rpc_dict, default=_orjson_default)
+        except orjson.JSONEncodeError:
+            # orjson rejects integers wider than 64 bits; defer to web3's encoder
+            return super().encode_rpc_request(method, params)
+    
+    @staticmethod
+    def decode_rpc_response(raw_response: bytes) -> RPCResponse:
+        if _LONG_DIGIT_RUN.search(raw_response):
+            # orjson parses integers wider than 64 bits as floats; keep them exact
+            return Web3.HTTPProvider.decode_rpc_response(raw_response)
+        return orjson.loads(raw_response)
+
 
 class ChainlinkOracleService:
     """Service for submitting data to Chainlink Oracle"""
@@ -20,6 +85,11 @@ class ChainlinkOracleService:
         self.account = None
         self.initialized = False
         
+        # Pending valuation submissions, flushed in batches by a background task
+        self._pending_submissions: List[PendingValuation] = []
+        self._flush_event = None
+        self._flush_task = None
+        
     async def initialize(self):
         """Initialize Chainlink Oracle connection"""
         try:
@@ -32,7 +102,7 @@ class ChainlinkOracleService:
                 return
             
             # Initialize Web3 connection
-            self.w3 = Web3(Web3.HTTPProvider(settings.arbitrum_rpc_url))
+            self.w3 = Web3(OrjsonHTTPProvider(settings.arbitrum_rpc_url))
             
             if not self.w3.is_connected():
                 logger.error("Failed to connect to Arbitrum network")
@@ -87,7 +157,7 @@ class ChainlinkOracleService:
         
         try:
             # Convert value to wei (assuming 18 decimals)
-            value_wei = self.w3.to_wei(estimated_value, 'ether')
+            value_wei = to_fixed_point(estimated_value)
             
             # Convert confidence to basis points (0-10000)
             confidence_bp = int(confidence_score * 10000)
@@ -138,6 +208,182 @@ class ChainlinkOracleService:
                         token_id=token_id, error=str(e))
             return None
     
+    def enqueue_valuation(
+        self,
+        token_id: str,
+        estimated_value: float,
+        confidence_score: float,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Queue a valuation for batched submission to Chainlink Oracle
+        
+        Queued valuations are flushed every oracle_flush_interval_ms, or as soon
+        as oracle_batch_size submissions are pending. Must be called from a
+        running event loop.
+        """
+        if not self.is_ready():
+            logger.warning("Chainlink Oracle not initialized or no account configured")
+            return
+        
+        self._pending_submissions.append((token_id, estimated_value, confidence_score, metadata, 0))
+        self._trim_pending()
+        
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_event = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        
+        if len(self._pending_submissions) >= settings.oracle_batch_size:
+            self._flush_event.set()
+    
+    def _trim_pending(self):
+        """Drop the oldest queued valuations beyond oracle_max_pending"""
+        excess = len(self._pending_submissions) - settings.oracle_max_pending
+        if excess > 0:
+            oldest_token_id = self._pending_submissions[0][0]
+            del self._pending_submissions[:excess]
+            logger.warning("Valuation queue full, dropping oldest submissions",
+                          dropped=excess, oldest_token_id=oldest_token_id)
+    
+    async def _flush_loop(self):
+        """Periodically flush pending valuation submissions"""
+        interval = settings.oracle_flush_interval_ms / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush_valuations()
+    
+    async def flush_valuations(self) -> List[str]:
+        """
+        Submit up to oracle_batch_size pending valuations, oldest first
+        
+        Nonce, gas price and chain ID are fetched once per batch and the
+        transactions are signed with consecutive nonces, so a batch costs three
+        RPC round trips plus one send per valuation. Valuations that hit a
+        transient RPC error go back to the front of the queue until they have
+        failed oracle_max_attempts times.
+        
+        Returns:
+            Transaction hashes of the submitted valuations
+        """
+        if not self._pending_submissions:
+            return []
+        
+        batch = self._pending_submissions[:settings.oracle_batch_size]
+        del self._pending_submissions[:len(batch)]
+        
+        try:
+            # web3's HTTP provider is blocking; keep it off the event loop
+            tx_hashes, failed, unsent = await asyncio.to_thread(self._send_valuation_batch, batch)
+        except TRANSIENT_RPC_ERRORS as e:
+            logger.warning("Chainlink Oracle unreachable, requeueing valuation batch",
+                          batch_size=len(batch), error=str(e))
+            tx_hashes, failed, unsent = [], batch, []
+        except Exception as e:
+            logger.error("Failed to submit valuation batch to Chainlink Oracle",
+                        batch_size=len(batch), error=str(e))
+            return []
+        
+        retry = []
+        for token_id, estimated_value, confidence_score, metadata, attempts in failed:
+            if attempts + 1 >= settings.oracle_max_attempts:
+                logger.error("Dropping valuation after repeated RPC failures",
+                            token_id=token_id, attempts=attempts + 1)
+                continue
+            retry.append((token_id, estimated_value, confidence_score, metadata, attempts + 1))
+        
+        # Retry on the next flush, ahead of newer valuations
+        self._pending_submissions[:0] = retry + unsent
+        self._trim_pending()
+        
+        # Keep draining a backlog while the RPC is healthy
+        if (
+            not failed
+            and self._flush_event is not None
+            and len(self._pending_submissions) >= settings.oracle_batch_size
+        ):
+            self._flush_event.set()
+        
+        return tx_hashes
+    
+    def _send_valuation_batch(
+        self,
+        batch: List[PendingValuation]
+    ) -> Tuple[List[str], List[PendingValuation], List[PendingValuation]]:
+        """
+        Sign and send a batch of valuation transactions
+        
+        Sending stops at the first transient RPC error: the failed transaction
+        may still have reached the mempool with its nonce, so later sends with
+        the same nonce could be rejected.
+        
+        Returns:
+            Transaction hashes of the sent valuations, the valuation that failed
+            with a transient RPC error (if any), and the valuations not tried
+        """
+        nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+        gas_price = self.w3.eth.gas_price
+        chain_id = self.w3.eth.chain_id
+        
+        tx_hashes = []
+        failed = []
+        unsent = []
+        for index, item in enumerate(batch):
+            token_id, estimated_value, confidence_score = item[:3]
+            try:
+                tx = self.oracle_contract.functions.submitValuation(
+                    int(token_id) if token_id.isdigit() else int(token_id, 16),
+                    to_fixed_point(estimated_value),
+                    int(confidence_score * 10000)
+                ).build_transaction({
+                    'from': self.account.address,
+                    'nonce': nonce,
+                    'gas': 200000,
+                    'gasPrice': gas_price,
+                    'chainId': chain_id,
+                })
+                
+                signed_tx = self.account.sign_transaction(tx)
+                tx_hashes.append(self.w3.eth.send_raw_transaction(signed_tx.rawTransaction).hex())
+            except TRANSIENT_RPC_ERRORS as e:
+                logger.warning("Valuation submission failed, requeueing the rest of the batch",
+                              token_id=token_id, error=str(e))
+                failed.append(item)
+                unsent = batch[index + 1:]
+                break
+            except Exception as e:
+                logger.error("Failed to submit valuation to Chainlink Oracle",
+                            token_id=token_id, error=str(e))
+                continue
+            
+            # Only a sent transaction consumes its nonce
+            nonce += 1
+        
+        logger.info("Valuation batch submitted to Chainlink Oracle",
+                   batch_size=len(batch), submitted=len(tx_hashes),
+                   requeued=len(failed) + len(unsent), tx_hashes=tx_hashes)
+        
+        return tx_hashes, failed, unsent
+    
+    async def close(self):
+        """Stop the flush task and submit pending valuations while the RPC keeps accepting them"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        
+        while self._pending_submissions:
+            pending = len(self._pending_submissions)
+            await self.flush_valuations()
+            if len(self._pending_submissions) >= pending:
+                break
+    
     async def get_latest_valuation(self, token_id: str) -> Optional[Dict[str, Any]]:
         """
         Get the latest valuation from Chainlink Oracle
@@ -16,6 +16,7 @@ import cv2
 import tempfile
 import os
 from collections import Counter
+from dataclasses import dataclass
 import asyncio
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from functools import lru_cache
@@ -33,9 +34,23 @@ from src.services.vector_db_service import vector_db
 logger = structlog.get_logger()
 
 
+@dataclass(frozen=True, slots=True)
+class CacheStats:
+    """Snapshot of the fingerprint cache and loaded models"""
+    cache_size: int
+    cache_ttl_seconds: int
+    device: str
+    models_loaded: Dict[str, bool]
+    hits: int = 0
+    misses: int = 0
+
+
 class FingerprintService:
     """Service for generating content fingerprints using AI models with optimizations"""
     
+    # Loaded models shared by every instance in the process, keyed by model and device
+    _model_cache: Dict[str, torch.nn.Module] = {}
+    
     def __init__(self):
         self.image_model = None
         self.audio_model = None
@@ -46,6 +61,9 @@ class FingerprintService:
         self.process_pool = ProcessPoolExecutor(max_workers=settings.max_workers)
         self._cache = {}  # In-memory cache for intermediate results
         self._cache_ttl = 3600  # 1 hour TTL
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._http: Optional[httpx.AsyncClient] = None  # Shared keep-alive client, see _get_http_client
     
     async def load_models(self):
         """Load AI models for fingerprinting with GPU acceleration"""
@@ -56,19 +74,11 @@ class FingerprintService:
             self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
             logger.info(f"Using device: {self.device}")
             
-            # Load image model (ResNet-50 for feature extraction)
-            self.image_model = torch.hub.load('pytorch/vision:v0.10.0', 'resnet50', pretrained=True)
-            self.image_model.eval()
-            
-            # Remove the final classification layer to get features
-            self.image_model = torch.nn.Sequential(*list(self.image_model.children())[:-1])
-            
-            # Move model to GPU if available
-            self.image_model = self.image_model.to(self.device)
-            
-            # Enable mixed precision for faster inference on GPU
-            if self.device.type == 'cuda':
-                self.image_model = self.image_model.half()  # Use FP16 for faster inference
+            # Load image model (ResNet-50 for feature extraction), once per process
+            model_key = f"resnet50:{self.device}"
+            if model_key not in self._model_cache:
+                self._model_cache[model_key] = self._load_image_model()
+            self.image_model = self._model_cache[model_key]
             
             # Image preprocessing with data augmentation for robustness
             self.transform = transforms.Compose([
@@ -90,6 +100,23 @@ class FingerprintService:
             # Continue without models for basic fingerprinting
             self.device = torch.device('cpu')
     
+    def _load_image_model(self) -> torch.nn.Module:
+        """Load ResNet-50 as a feature extractor on the selected device"""
+        model = torch.hub.load('pytorch/vision:v0.10.0', 'resnet50', pretrained=True)
+        model.eval()
+        
+        # Remove the final classification layer to get features
+        model = torch.nn.Sequential(*list(model.children())[:-1])
+        
+        # Move model to GPU if available
+        model = model.to(self.device)
+        
+        # Enable mixed precision for faster inference on GPU
+        if self.device.type == 'cuda':
+            model = model.half()  # Use FP16 for faster inference
+        
+        return model
+    
     async def generate_fingerprint(
         self,
         content_url: str,
@@ -107,7 +134,10 @@ class FingerprintService:
                 cached_result, cached_time = self._cache[cache_key]
                 if time.time() - cached_time < self._cache_ttl:
                     logger.info("Returning cached fingerprint", content_type=content_type)
+                    self._cache_hits += 1
                     return cached_result
+            if use_cache:
+                self._cache_misses += 1
             
             logger.info("Generating fingerprint", content_type=content_type)
             
@@ -548,18 +578,31 @@ class FingerprintService:
             return Image.open(io.BytesIO(image_data)).convert('RGB')
         else:
             # Download from URL
-            async with httpx.AsyncClient() as client:
-                response = await client.get(content_url)
-                response.raise_for_status()
-                return Image.open(io.BytesIO(response.content)).convert('RGB')
+            image_data = await self._download_content(content_url)
+            return Image.open(io.BytesIO(image_data)).convert('RGB')
     
     async def _download_content(self, content_url: str) -> bytes:
         """Download content from URL"""
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(content_url)
-            response.raise_for_status()
-            return response.content
+        response = await self._get_http_client().get(content_url)
+        response.raise_for_status()
+        return response.content
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP/2 client, creating it on first use"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                http2=True,
+                timeout=5.0,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            )
+        return self._http
+    
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
     
     def _calculate_phash(self, image: Image.Image) -> str:
         """Calculate perceptual hash for image"""
@@ -769,15 +812,17 @@ class FingerprintService:
         self._cache.clear()
         logger.info("Fingerprint cache cleared")
     
-    def get_cache_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
-        return {
-            "cache_size": len(self._cache),
-            "cache_ttl_seconds": self._cache_ttl,
-            "device": str(self.device) if self.device else "not_initialized",
-            "models_loaded": {
+    def get_cache_stats(self) -> CacheStats:
+        """Get cache statistics (use dataclasses.asdict for a JSON-ready dict)"""
+        return CacheStats(
+            cache_size=len(self._cache),
+            cache_ttl_seconds=self._cache_ttl,
+            device=str(self.device) if self.device else "not_initialized",
+            models_loaded={
                 "image": self.image_model is not None,
                 "audio": self.audio_model is not None,
                 "video": self.video_model is not None,
-            }
-        }
\ No newline at end of file
+            },
+            hits=self._cache_hits,
+            misses=self._cache_misses,
+        )
\ No newline at end of file
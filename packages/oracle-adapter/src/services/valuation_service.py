@@ -2,45 +2,252 @@
 
 import torch
 import torch.nn as nn
+from torch.nn.utils.fusion import fuse_linear_bn_eval
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Callable, Sequence
 import structlog
 from web3 import Web3
-from eth_account import Account
 import json
 import httpx
 import time
 from datetime import datetime, timedelta
 from sklearn.preprocessing import StandardScaler
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.model_selection import cross_val_score
 from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.exceptions import NotFittedError
+from sklearn.utils.validation import check_is_fitted
+from skl2onnx import to_onnx
+import onnxruntime as ort
 import joblib
+from numba import njit
+import asyncio
+import copy
+import inspect
+import io
 import os
+from collections import OrderedDict
+from dataclasses import dataclass
 
 from src.config import settings
 from src.models.schemas import ValuationResponse
+from src.services.chainlink_service import OrjsonHTTPProvider, chainlink_oracle
 
 logger = structlog.get_logger()
 
+# (high, low) score thresholds for classifying a factor's impact
+FACTOR_IMPACT_THRESHOLDS = {
+    "creator_reputation": (0.7, 0.3),
+    "content_quality": (0.8, 0.4),
+    "category_popularity": (0.6, 0.3),
+    "rarity": (0.7, 0.3),
+    "market_sentiment": (0.6, 0.4),
+    "liquidity": (0.5, 0.2),
+}
+
+# Category reference data (mock data; in production, from the analytics database)
+CATEGORY_POPULARITY = {
+    "music": 0.85,
+    "video": 0.80,
+    "art": 0.75,
+    "ebook": 0.60,
+    "course": 0.70,
+    "software": 0.65,
+}
+CATEGORY_VOLUMES_24H = {"music": 50000, "art": 75000, "video": 30000, "ebook": 15000}
+CATEGORY_AVG_PRICES = {"music": 2500, "art": 5000, "video": 3000, "ebook": 1500}
+
+
+@njit(cache=True, fastmath=True)
+def _similarity_kernel(
+    category_match, creator_match, quality, rarity, timestamps,
+    target_quality, target_rarity, now,
+):
+    """Score historical sales against a target, one row per sale"""
+    scores = np.empty(quality.shape[0], dtype=np.float64)
+    for i in range(quality.shape[0]):
+        # Category match (40%) and creator match (20%)
+        score = 0.4 * category_match[i] + 0.2 * creator_match[i]
+        
+        # Quality (20%) and rarity (10%) similarity
+        score += (1.0 - abs(target_quality - quality[i])) * 0.2
+        score += (1.0 - abs(target_rarity - rarity[i])) * 0.1
+        
+        # Time decay (10%) over one year
+        days_ago = (now - timestamps[i]) / (24 * 3600)
+        score += max(0.0, 1.0 - days_ago / 365) * 0.1
+        
+        scores[i] = min(score, 1.0)
+    return scores
+
+
+@dataclass
+class FeatureSummary:
+    """Statistics of one feature vector shared by the post-prediction steps"""
+    mean: float
+    nonzero_fraction: float
+    creator_reputation: float
+    content_quality: float
+    category_popularity: float
+    rarity: float
+    market_sentiment: float
+    liquidity: float
+    
+    @classmethod
+    def from_features(cls, features: np.ndarray) -> "FeatureSummary":
+        """Summarize a feature vector in one pass over the buffer"""
+        creator, quality, popularity, rarity, sentiment, liquidity = (
+            features[[0, 1, 2, 3, -6, -3]].tolist()
+        )
+        return cls(
+            mean=float(features.mean()),
+            nonzero_fraction=np.count_nonzero(features) / features.size,
+            creator_reputation=creator,
+            content_quality=quality,
+            category_popularity=popularity,
+            rarity=rarity,
+            market_sentiment=sentiment,
+            liquidity=liquidity,
+        )
+
+
+class InferenceBatcher:
+    """Coalesce concurrent single-row predictions into one batched model call"""
+    
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], Sequence[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+    ):
+        self.predict_fn = predict_fn  # (B, n_features) array -> B results
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+        self._loop = None
+        self._batch = []  # (row, future) pairs being collected by the worker
+    
+    def start(self):
+        """Start the batching worker on the running event loop"""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._worker = self._loop.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the batching worker, failing predictions it has not answered"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        
+        pending = self._batch
+        self._batch = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("batcher stopped"))
+    
+    async def submit(self, row: np.ndarray) -> Any:
+        """Queue a single feature row and wait for its prediction"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or loop is not self._loop:
+            # No worker on this loop, predict directly
+            return self.predict_fn(row[np.newaxis, :])[0]
+        
+        future = loop.create_future()
+        self._queue.put_nowait((row, future))
+        return await future
+    
+    async def _run(self):
+        while True:
+            batch = self._batch = [await self._queue.get()]
+            
+            # Let concurrent callers enqueue, then wait up to max_wait for more
+            await asyncio.sleep(0)
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                results = self.predict_fn(np.stack([row for row, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            self._batch = []
+
 
 class ValuationService:
     """Service for estimating IP value using ML models"""
     
     def __init__(self):
         self.neural_model = None
+        self.inference_model = None
+        self.neural_session = None  # ONNX Runtime session of the inference model, if enabled
         self.ensemble_model = None
+        self.ensemble_sessions = {}  # model name -> ONNX Runtime session of the fitted estimator
         self.scaler = StandardScaler()
+        self._scaler_mean = None
+        self._scaler_scale = None
         self.w3 = None
-        self.oracle_contract = None
-        self.account = None
         self.historical_data_cache = {}
-        self.market_data_cache = {}
+        self._rng = np.random.default_rng()  # Service-local generator for mock analytics
+        self.market_data_cache = OrderedDict()  # category -> (expires_at, market_data), LRU order
+        self._market_data_ttl = 3600  # 1 hour TTL
+        self._market_data_cache_size = 256
+        
+        # Micro-batching for concurrent valuation requests
+        self._neural_batcher = InferenceBatcher(
+            self._predict_neural_batch,
+            settings.valuation_batch_max_size,
+            settings.valuation_batch_max_wait_ms,
+        )
+        self._ensemble_batcher = InferenceBatcher(
+            self._predict_ensemble_batch,
+            settings.valuation_batch_max_size,
+            settings.valuation_batch_max_wait_ms,
+        )
+        
+        # Background consumer for model metrics updates, bounded so a slow
+        # metrics sink cannot accumulate unbounded work
+        self._metrics_queue = None
+        self._metrics_worker = None
+        self._metrics_queue_size = 1024
+        
+        # In-memory reference data for feature lookups, refreshed in the background
+        self._category_popularity = self._load_category_popularity()
+        self._creator_reputation = OrderedDict()  # creator address -> score, LRU order
+        self._creator_reputation_size = 4096
+        self._reference_data_refresh_interval = 300  # seconds
+        self._reference_data_task = None
         
         # Initialize Web3 connection
         if settings.arbitrum_rpc_url:
-            self.w3 = Web3(Web3.HTTPProvider(settings.arbitrum_rpc_url))
+            self.w3 = Web3(OrjsonHTTPProvider(settings.arbitrum_rpc_url))
             logger.info("Web3 connection initialized", network="Arbitrum")
         
         # Enhanced feature weights for valuation
@@ -82,6 +289,23 @@ class ValuationService:
             # Initialize scaler with historical data
             await self._initialize_scaler()
             
+            # Derive the inference-only network from the loaded weights
+            self.inference_model = self._build_inference_model()
+            self.neural_session = self._build_neural_session()
+            self.ensemble_sessions = self._build_ensemble_sessions()
+            
+            # Compile (or load from the on-disk cache) the numba kernels before the first request
+            self._warm_up_kernels()
+            
+            # Start micro-batching workers
+            self._neural_batcher.start()
+            self._ensemble_batcher.start()
+            self._start_metrics_worker()
+            
+            # Keep category/creator lookup tables fresh
+            if self._reference_data_task is None or self._reference_data_task.done():
+                self._reference_data_task = asyncio.create_task(self._refresh_reference_data())
+            
             logger.info("Valuation models loaded successfully")
         except Exception as e:
             logger.error("Failed to load valuation models", error=str(e))
@@ -133,6 +357,62 @@ class ValuationService:
         
         return EnhancedValuationModel()
     
+    def _eval_copy(self) -> torch.nn.Module:
+        """Copy the neural model in eval mode with dropout removed and BatchNorm folded"""
+        model = copy.deepcopy(self.neural_model)
+        model.eval()
+        self._strip_dropout(model)
+        self._fold_batchnorm(model.feature_extractor)
+        return model
+    
+    def _build_inference_model(self) -> torch.nn.Module:
+        """Build an eval-only copy of the neural model with training-only layers removed"""
+        model = self._eval_copy()
+        
+        if settings.valuation_quantize_model:
+            # int8 weights with dynamic activation quantization for the Linear layers
+            model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+        
+        if settings.valuation_compile_model:
+            model = self._compile_model(model)
+        
+        return model
+    
+    @staticmethod
+    def _compile_model(model: torch.nn.Module) -> torch.nn.Module:
+        """Compile the model with torch.compile, falling back to eager mode"""
+        try:
+            compiled = torch.compile(model, mode="reduce-overhead")
+            
+            # Warm up so compilation happens at load time, not on the first request
+            with torch.inference_mode():
+                compiled(torch.zeros(1, 30))
+            
+            logger.info("Valuation model compiled with torch.compile")
+            return compiled
+        except Exception as e:
+            logger.warning("torch.compile unavailable, using eager model", error=str(e))
+            return model
+    
+    @staticmethod
+    def _fold_batchnorm(sequential: nn.Sequential):
+        """Fold each BatchNorm1d into the preceding Linear layer (eval mode only)"""
+        layers = list(sequential.children())
+        for i in range(1, len(layers)):
+            linear, bn = layers[i - 1], layers[i]
+            if isinstance(linear, nn.Linear) and isinstance(bn, nn.BatchNorm1d):
+                sequential[i - 1] = fuse_linear_bn_eval(linear, bn)
+                sequential[i] = nn.Identity()
+    
+    @staticmethod
+    def _strip_dropout(module: torch.nn.Module):
+        """Replace Dropout layers with Identity (Dropout is a no-op in eval mode)"""
+        for name, child in module.named_children():
+            if isinstance(child, nn.Dropout):
+                setattr(module, name, nn.Identity())
+            else:
+                ValuationService._strip_dropout(child)
+    
     def _create_ensemble_model(self) -> Dict[str, Any]:
         """Create ensemble of traditional ML models"""
         return {
@@ -141,6 +421,7 @@ class ValuationService:
                 max_depth=10,
                 min_samples_split=5,
                 min_samples_leaf=2,
+                n_jobs=-1,
                 random_state=42,
             ),
             'gradient_boosting': GradientBoostingRegressor(
@@ -153,6 +434,77 @@ class ValuationService:
             ),
         }
     
+    @staticmethod
+    def _create_onnx_session(onnx_bytes: bytes) -> ort.InferenceSession:
+        """Create a CPU ONNX Runtime session with the configured thread count"""
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = settings.valuation_onnx_threads
+        options.inter_op_num_threads = 1
+        return ort.InferenceSession(onnx_bytes, sess_options=options, providers=["CPUExecutionProvider"])
+    
+    def _build_neural_session(self) -> Optional[ort.InferenceSession]:
+        """Export the inference network to an ONNX Runtime session when enabled"""
+        # Quantization and torch.compile are torch-side options; either one keeps torch serving
+        if (
+            not settings.valuation_onnx_neural
+            or settings.valuation_quantize_model
+            or settings.valuation_compile_model
+        ):
+            return None
+        
+        try:
+            # The TorchScript exporter needs no extra packages; newer torch defaults to torch.export
+            export_kwargs = {}
+            if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+                export_kwargs["dynamo"] = False
+            
+            buffer = io.BytesIO()
+            torch.onnx.export(
+                self._eval_copy(),
+                (torch.zeros(1, 30),),
+                buffer,
+                input_names=["features"],
+                output_names=["value", "uncertainty"],
+                dynamic_axes={"features": {0: "batch"}},
+                opset_version=17,
+                **export_kwargs,
+            )
+            session = self._create_onnx_session(buffer.getvalue())
+            logger.info("Valuation network exported to ONNX Runtime")
+            return session
+        except Exception as e:
+            logger.warning("ONNX export of valuation network failed, using torch", error=str(e))
+            return None
+    
+    def _build_ensemble_sessions(
+        self, ensemble_model: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, ort.InferenceSession]:
+        """Export the fitted ensemble estimators (default: the serving ones) to ONNX Runtime sessions"""
+        if ensemble_model is None:
+            ensemble_model = self.ensemble_model
+        sessions = {}
+        
+        for model_name, model in (ensemble_model or {}).items():
+            try:
+                check_is_fitted(model)
+            except NotFittedError:
+                continue
+            
+            try:
+                onnx_model = to_onnx(model, np.zeros((1, 30), dtype=np.float32), target_opset=17)
+                sessions[model_name] = self._create_onnx_session(onnx_model.SerializeToString())
+            except Exception as e:
+                # Converter errors can embed the whole graph; keep the log line short
+                logger.warning(
+                    "ONNX export failed, using sklearn predict",
+                    model=model_name,
+                    error_type=type(e).__name__,
+                    error=str(e)[:500],
+                )
+        
+        return sessions
+    
     async def _load_pretrained_models(self):
         """Load pre-trained models from disk if available"""
         try:
@@ -164,11 +516,15 @@ class ValuationService:
                 logger.info("Pre-trained neural model loaded")
             
             if os.path.exists(f"{model_dir}/ensemble_models.joblib"):
-                self.ensemble_model = joblib.load(f"{model_dir}/ensemble_models.joblib")
+                # Memory-map the numeric arrays; predict and refit never write to them in place
+                self.ensemble_model = joblib.load(
+                    f"{model_dir}/ensemble_models.joblib", mmap_mode='r'
+                )
                 logger.info("Pre-trained ensemble models loaded")
                 
             if os.path.exists(f"{model_dir}/scaler.joblib"):
                 self.scaler = joblib.load(f"{model_dir}/scaler.joblib")
+                self._cache_scaler_params()
                 logger.info("Pre-trained scaler loaded")
                 
         except Exception as e:
@@ -180,12 +536,29 @@ class ValuationService:
             # Get sample historical data for scaler initialization
             sample_data = await self._get_historical_training_data(limit=1000)
             if sample_data:
-                features = np.array([self._extract_features_array(d) for d in sample_data])
+                features = np.zeros((len(sample_data), 30), dtype=np.float32)
+                for row, record in zip(features, sample_data):
+                    self._write_features(row, record)
                 self.scaler.fit(features)
+                self._cache_scaler_params()
                 logger.info("Feature scaler initialized with historical data")
         except Exception as e:
             logger.warning("Could not initialize scaler", error=str(e))
     
+    def _cache_scaler_params(self):
+        """Cache the fitted scaler's affine parameters as float32 arrays"""
+        mean = self.scaler.mean_ if self.scaler.mean_ is not None else 0.0
+        scale = self.scaler.scale_ if self.scaler.scale_ is not None else 1.0
+        self._scaler_mean = np.asarray(mean, dtype=np.float32)
+        self._scaler_scale = np.asarray(scale, dtype=np.float32)
+    
+    def _scale(self, features_np: np.ndarray) -> np.ndarray:
+        """Standardize features without sklearn's per-call validation overhead"""
+        if self._scaler_mean is None:
+            # Scaler not fitted yet; let sklearn raise the usual error
+            return self.scaler.transform(features_np)
+        return (features_np - self._scaler_mean) / self._scaler_scale
+    
     async def estimate_value(
         self,
         token_id: int,
@@ -209,53 +582,63 @@ class ValuationService:
             # 1. Gather comprehensive market data
             market_data = await self._gather_market_data(metadata)
             
-            # 2. Extract and prepare enhanced features
-            features = await self._prepare_enhanced_features(
-                token_id, metadata, historical_data, market_data
+            # Column arrays of the historical sales, shared by steps 2 and 3
+            historical_soa = self._historical_to_soa(historical_data) if historical_data else None
+            
+            # 2. Extract and prepare enhanced features, and find comparable sales
+            #    (independent of each other, so run concurrently)
+            features, comparable_sales = await asyncio.gather(
+                self._prepare_enhanced_features(
+                    token_id, metadata, historical_data, market_data, historical_soa
+                ),
+                self._find_enhanced_comparable_sales(
+                    metadata, historical_data, market_data, historical_soa
+                ),
             )
             
             # 3. Run ensemble valuation models
-            neural_prediction = await self._run_neural_model(features)
-            ensemble_prediction = await self._run_ensemble_models(features)
+            neural_prediction, ensemble_prediction = await asyncio.gather(
+                self._run_neural_model(features),
+                self._run_ensemble_models(features),
+            )
             
             # 4. Combine predictions with confidence weighting
             estimated_value, model_uncertainty = self._combine_predictions(
                 neural_prediction, ensemble_prediction
             )
             
+            # Summarize the features once for steps 5 and 6
+            summary = FeatureSummary.from_features(features)
+            
             # 5. Calculate enhanced confidence interval with uncertainty quantification
             confidence_interval = await self._calculate_enhanced_confidence_interval(
-                estimated_value, model_uncertainty, features, market_data
-            )
-            
-            # 6. Find and analyze comparable sales
-            comparable_sales = await self._find_enhanced_comparable_sales(
-                metadata, historical_data, market_data
+                estimated_value, model_uncertainty, summary, market_data
             )
             
-            # 7. Generate explainable valuation factors
+            # 6. Generate explainable valuation factors
             factors = await self._calculate_explainable_factors(
-                features, metadata, market_data, estimated_value
+                summary, metadata, market_data, estimated_value
             )
             
-            # 8. Validate prediction against market bounds
+            # 7. Validate prediction against market bounds
             estimated_value = self._validate_market_bounds(
                 estimated_value, metadata, comparable_sales
             )
             
-            # 9. Submit to Chainlink Oracle (if configured)
+            # 8. Submit to Chainlink Oracle (if configured)
             if settings.chainlink_oracle_address:
-                from src.services.chainlink_service import chainlink_oracle
                 if chainlink_oracle.is_ready():
-                    await chainlink_oracle.submit_valuation(
+                    # Queued and submitted in batches; the on-chain valuation is
+                    # advisory so the response does not wait for it
+                    chainlink_oracle.enqueue_valuation(
                         str(token_id),
                         estimated_value,
                         1.0 - model_uncertainty,
                         metadata
                     )
             
-            # 10. Update model performance metrics
-            await self._update_model_metrics(estimated_value, features)
+            # 9. Update model performance metrics (in the background)
+            await self._record_metrics(estimated_value, features)
             
             processing_time = (time.time() - start_time) * 1000
             
@@ -287,21 +670,44 @@ class ValuationService:
             category = metadata.get("category", "unknown")
             
             # Get market data from cache or fetch fresh
-            cache_key = f"market_data_{category}_{datetime.now().strftime('%Y%m%d')}"
-            if cache_key in self.market_data_cache:
-                return self.market_data_cache[cache_key]
+            cached = self.market_data_cache.get(category)
+            if cached is not None:
+                expires_at, market_data = cached
+                if expires_at > time.monotonic():
+                    self.market_data_cache.move_to_end(category)
+                    return market_data
+                del self.market_data_cache[category]
+            
+            # Fetch the independent market data sources concurrently
+            (
+                category_volume,
+                category_avg_price,
+                market_volatility,
+                trending_categories,
+                liquidity_metrics,
+                macro_indicators,
+            ) = await asyncio.gather(
+                self._get_category_volume(category),
+                self._get_category_avg_price(category),
+                self._get_market_volatility(),
+                self._get_trending_categories(),
+                self._get_liquidity_metrics(category),
+                self._get_macro_indicators(),
+            )
             
             market_data = {
-                "category_volume_24h": await self._get_category_volume(category),
-                "category_avg_price": await self._get_category_avg_price(category),
-                "market_volatility": await self._get_market_volatility(),
-                "trending_categories": await self._get_trending_categories(),
-                "liquidity_metrics": await self._get_liquidity_metrics(category),
-                "macro_indicators": await self._get_macro_indicators(),
+                "category_volume_24h": category_volume,
+                "category_avg_price": category_avg_price,
+                "market_volatility": market_volatility,
+                "trending_categories": trending_categories,
+                "liquidity_metrics": liquidity_metrics,
+                "macro_indicators": macro_indicators,
             }
             
-            # Cache for 1 hour
-            self.market_data_cache[cache_key] = market_data
+            # Cache for 1 hour, evicting the least recently used category
+            self.market_data_cache[category] = (time.monotonic() + self._market_data_ttl, market_data)
+            if len(self.market_data_cache) > self._market_data_cache_size:
+                self.market_data_cache.popitem(last=False)
             return market_data
             
         except Exception as e:
@@ -314,14 +720,16 @@ class ValuationService:
         metadata: Dict[str, Any],
         historical_data: Optional[List[Dict[str, Any]]],
         market_data: Dict[str, Any],
-    ) -> torch.Tensor:
+        historical_soa: Optional[Dict[str, np.ndarray]] = None,
+    ) -> np.ndarray:
         """Prepare enhanced feature vector for valuation models"""
         
-        features = []
+        # Preallocated buffer; unused trailing slots stay zero-padded
+        features = np.zeros(30, dtype=np.float32)
         
         # 1. Creator and Content Features
         creator_reputation = await self._get_creator_reputation(metadata.get("creator", ""))
-        features.extend([
+        features[0:8] = (
             creator_reputation,
             metadata.get("quality_score", 0.5),
             metadata.get("rarity", 0.5),
@@ -330,185 +738,141 @@ class ValuationService:
             min(metadata.get("views", 0) / 10000, 1.0),
             min(metadata.get("likes", 0) / 1000, 1.0),
             min(metadata.get("shares", 0) / 500, 1.0),
-        ])
+        )
         
         # 2. Historical Performance Features
         if historical_data:
-            prices = [d.get("price", 0) for d in historical_data]
-            volumes = [d.get("volume", 0) for d in historical_data]
+            if historical_soa is None:
+                historical_soa = self._historical_to_soa(historical_data)
+            prices = historical_soa["price"]
             
-            features.extend([
-                np.mean(prices) / 10000 if prices else 0.5,
-                np.max(prices) / 50000 if prices else 0.5,
-                np.std(prices) / 5000 if len(prices) > 1 else 0.1,
-                len(historical_data) / 100,
-                np.mean(volumes) if volumes else 0.1,
-            ])
+            features[8:13] = (
+                prices.mean() / 10000,
+                prices.max() / 50000,
+                prices.std() / 5000 if len(prices) > 1 else 0.1,
+                len(prices) / 100,
+                historical_soa["volume"].mean(),
+            )
         else:
-            features.extend([0.5, 0.5, 0.1, 0.1, 0.1])
+            features[8:13] = (0.5, 0.5, 0.1, 0.1, 0.1)
         
         # 3. Market and Category Features
         category = metadata.get("category", "unknown")
-        category_popularity = await self._get_category_popularity(category)
+        category_popularity = self._get_category_popularity(category)
         
-        features.extend([
+        features[13:17] = (
             category_popularity,
             market_data.get("category_volume_24h", 0) / 1000000,  # Normalized
             market_data.get("category_avg_price", 1000) / 10000,
             market_data.get("market_volatility", 0.2),
-        ])
+        )
         
         # 4. Temporal Features
         current_time = datetime.now()
-        features.extend([
+        features[17:21] = (
             self._get_market_sentiment(),
             self._get_seasonal_factor(),
             (current_time.hour / 24),  # Time of day
             (current_time.weekday() / 7),  # Day of week
-        ])
+        )
         
         # 5. Liquidity and Trading Features
         liquidity_metrics = market_data.get("liquidity_metrics", {})
-        features.extend([
+        features[21:24] = (
             liquidity_metrics.get("bid_ask_spread", 0.1),
             liquidity_metrics.get("order_book_depth", 0.5),
             liquidity_metrics.get("trading_frequency", 0.3),
-        ])
+        )
         
         # 6. Macro Economic Indicators
         macro_indicators = market_data.get("macro_indicators", {})
-        features.extend([
+        features[24:27] = (
             macro_indicators.get("crypto_market_cap", 0.5),
             macro_indicators.get("nft_market_sentiment", 0.5),
             macro_indicators.get("risk_appetite", 0.5),
-        ])
-        
-        # Pad to 30 features
-        while len(features) < 30:
-            features.append(0.0)
-        
-        return torch.tensor(features[:30], dtype=torch.float32)
-    
-    async def _prepare_features(
-        self,
-        token_id: int,
-        metadata: Dict[str, Any],
-        historical_data: Optional[List[Dict[str, Any]]],
-    ) -> torch.Tensor:
-        """Prepare feature vector for valuation model"""
-        
-        features = []
-        
-        # Creator reputation (0-1)
-        creator_reputation = await self._get_creator_reputation(
-            metadata.get("creator", "")
         )
-        features.append(creator_reputation)
-        
-        # Content quality score (0-1)
-        quality_score = metadata.get("quality_score", 0.5)
-        features.append(quality_score)
-        
-        # Category popularity (0-1)
-        category = metadata.get("category", "unknown")
-        category_score = await self._get_category_popularity(category)
-        features.append(category_score)
-        
-        # Rarity score (0-1)
-        rarity = metadata.get("rarity", 0.5)
-        features.append(rarity)
-        
-        # Historical performance metrics
-        if historical_data:
-            avg_price = np.mean([d.get("price", 0) for d in historical_data])
-            max_price = np.max([d.get("price", 0) for d in historical_data])
-            volume = len(historical_data)
-            
-            features.extend([
-                min(avg_price / 10000, 1.0),  # Normalized average price
-                min(max_price / 50000, 1.0),  # Normalized max price
-                min(volume / 100, 1.0),       # Normalized volume
-            ])
-        else:
-            features.extend([0.5, 0.5, 0.1])  # Default values
-        
-        # Content metadata features
-        features.extend([
-            min(metadata.get("views", 0) / 10000, 1.0),
-            min(metadata.get("likes", 0) / 1000, 1.0),
-            min(metadata.get("shares", 0) / 500, 1.0),
-            metadata.get("has_license", 0),
-            metadata.get("is_verified", 0),
-        ])
-        
-        # Market timing features
-        features.extend([
-            self._get_market_sentiment(),
-            self._get_seasonal_factor(),
-        ])
-        
-        # Pad to 20 features
-        while len(features) < 20:
-            features.append(0.0)
         
-        return torch.tensor(features[:20], dtype=torch.float32)
+        return features
     
-    async def _run_neural_model(self, features: torch.Tensor) -> Tuple[float, float]:
+    async def _run_neural_model(self, features: np.ndarray) -> Tuple[float, float]:
         """Run the neural network model to estimate value and uncertainty"""
         
-        if self.neural_model is None:
+        if self.inference_model is None:
             # Fallback to rule-based valuation
             value = self._rule_based_valuation(features)
             return value, value * 0.3  # 30% uncertainty
         
-        with torch.no_grad():
+        return await self._neural_batcher.submit(features)
+    
+    def _predict_neural_batch(self, features_np: np.ndarray) -> List[Tuple[float, float]]:
+        """Run the neural network on a batch of feature rows"""
+        
+        if self.neural_session is not None:
+            value_output, uncertainty_output = self.neural_session.run(
+                None, {"features": self._scale(features_np)}
+            )
+            estimated_values = np.exp(value_output[:, 0]).tolist()
+            model_uncertainties = uncertainty_output[:, 0].tolist()
+        else:
+            estimated_values, model_uncertainties = self._run_torch_model(features_np)
+        
+        # Clamp to reasonable range
+        return [
+            (max(100, min(value, 1000000)), max(0.01, min(uncertainty, 0.8)))
+            for value, uncertainty in zip(estimated_values, model_uncertainties)
+        ]
+    
+    def _run_torch_model(self, features_np: np.ndarray) -> Tuple[List[float], List[float]]:
+        """Run the torch inference model, returning values in USD and uncertainties"""
+        with torch.inference_mode():
             # Normalize features
-            features_np = features.numpy().reshape(1, -1)
-            features_scaled = self.scaler.transform(features_np)
-            features_tensor = torch.tensor(features_scaled, dtype=torch.float32)
+            features_scaled = self._scale(features_np)
+            features_tensor = torch.from_numpy(features_scaled)
             
             # Run model
-            value_output, uncertainty_output = self.neural_model(features_tensor)
+            value_output, uncertainty_output = self.inference_model(features_tensor)
             
             # Convert to USD value (scale output)
-            estimated_value = float(torch.exp(value_output).item())
-            model_uncertainty = float(uncertainty_output.item())
-            
-            # Clamp to reasonable range
-            estimated_value = max(100, min(estimated_value, 1000000))
-            model_uncertainty = max(0.01, min(model_uncertainty, 0.8))
+            estimated_values = torch.exp(value_output).squeeze(1).tolist()
+            model_uncertainties = uncertainty_output.squeeze(1).tolist()
         
-        return estimated_value, model_uncertainty
+        return estimated_values, model_uncertainties
     
-    async def _run_ensemble_models(self, features: torch.Tensor) -> Dict[str, float]:
+    async def _run_ensemble_models(self, features: np.ndarray) -> Dict[str, float]:
         """Run ensemble of traditional ML models"""
         
         if not self.ensemble_model:
             return {}
         
         try:
-            # Prepare features for sklearn models
-            features_np = features.numpy().reshape(1, -1)
-            features_scaled = self.scaler.transform(features_np)
-            
-            predictions = {}
-            
-            # Random Forest prediction
-            if 'random_forest' in self.ensemble_model:
-                rf_pred = self.ensemble_model['random_forest'].predict(features_scaled)[0]
-                predictions['random_forest'] = max(100, min(rf_pred, 1000000))
-            
-            # Gradient Boosting prediction
-            if 'gradient_boosting' in self.ensemble_model:
-                gb_pred = self.ensemble_model['gradient_boosting'].predict(features_scaled)[0]
-                predictions['gradient_boosting'] = max(100, min(gb_pred, 1000000))
-            
-            return predictions
-            
+            return await self._ensemble_batcher.submit(features)
         except Exception as e:
             logger.warning("Ensemble model prediction failed", error=str(e))
             return {}
     
+    def _predict_ensemble_batch(self, features_np: np.ndarray) -> List[Dict[str, float]]:
+        """Run the ensemble models on a batch of feature rows"""
+        
+        # Prepare features for sklearn models
+        features_scaled = self._scale(features_np)
+        
+        predictions = [{} for _ in range(len(features_np))]
+        
+        for model_name in ('random_forest', 'gradient_boosting'):
+            session = self.ensemble_sessions.get(model_name)
+            if session is not None:
+                input_name = session.get_inputs()[0].name
+                model_preds = session.run(None, {input_name: features_scaled})[0].ravel().tolist()
+            elif model_name in self.ensemble_model:
+                model_preds = self.ensemble_model[model_name].predict(features_scaled)
+            else:
+                continue
+            
+            for row_predictions, pred in zip(predictions, model_preds):
+                row_predictions[model_name] = max(100, min(pred, 1000000))
+        
+        return predictions
+    
     def _combine_predictions(
         self, 
         neural_prediction: Tuple[float, float], 
@@ -546,7 +910,7 @@ class ValuationService:
         
         return combined_value, combined_uncertainty
     
-    def _rule_based_valuation(self, features: torch.Tensor) -> float:
+    def _rule_based_valuation(self, features: np.ndarray) -> float:
         """Fallback rule-based valuation when model is not available"""
         
         features_list = features.tolist()
@@ -573,7 +937,7 @@ class ValuationService:
         self,
         estimated_value: float,
         model_uncertainty: float,
-        features: torch.Tensor,
+        summary: FeatureSummary,
         market_data: Dict[str, Any],
     ) -> List[float]:
         """Calculate enhanced confidence interval with multiple uncertainty sources"""
@@ -582,7 +946,7 @@ class ValuationService:
         model_std = model_uncertainty
         
         # 2. Feature quality uncertainty
-        feature_quality = float(torch.mean(features).item())
+        feature_quality = summary.mean
         feature_uncertainty = 0.3 - (feature_quality * 0.2)  # 10-30% based on feature quality
         
         # 3. Market volatility uncertainty
@@ -590,7 +954,7 @@ class ValuationService:
         volatility_uncertainty = market_volatility * 0.5  # Scale market volatility
         
         # 4. Data availability uncertainty
-        data_completeness = self._assess_data_completeness(features, market_data)
+        data_completeness = self._assess_data_completeness(summary, market_data)
         data_uncertainty = (1 - data_completeness) * 0.2  # Up to 20% for incomplete data
         
         # 5. Historical prediction accuracy
@@ -617,13 +981,13 @@ class ValuationService:
     
     def _assess_data_completeness(
         self, 
-        features: torch.Tensor, 
+        summary: FeatureSummary, 
         market_data: Dict[str, Any]
     ) -> float:
         """Assess completeness of data for uncertainty calculation"""
         
         # Check feature completeness
-        feature_completeness = 1.0 - (features == 0).float().mean().item()
+        feature_completeness = summary.nonzero_fraction
         
         # Check market data completeness
         market_completeness = len(market_data) / 6  # Expected 6 market data fields
@@ -637,115 +1001,118 @@ class ValuationService:
         metadata: Dict[str, Any],
         historical_data: Optional[List[Dict[str, Any]]],
         market_data: Dict[str, Any],
+        historical_soa: Optional[Dict[str, np.ndarray]] = None,
     ) -> List[Dict[str, Any]]:
         """Find enhanced comparable sales with similarity scoring"""
         
         if not historical_data:
             # Try to fetch from external sources
             historical_data = await self._fetch_external_comparable_sales(metadata)
+            historical_soa = None
         
         if not historical_data:
             return []
         
-        category = metadata.get("category", "")
-        creator = metadata.get("creator", "")
-        quality_score = metadata.get("quality_score", 0.5)
+        if historical_soa is None:
+            historical_soa = self._historical_to_soa(historical_data)
+        timestamps = historical_soa["timestamp"]
         
-        # Calculate similarity scores for each historical sale
-        comparable_with_scores = []
+        # Calculate similarity scores for all historical sales at once
+        scores = self._calculate_similarity_scores(metadata, historical_soa)
         
-        for sale in historical_data:
-            similarity_score = self._calculate_similarity_score(metadata, sale)
-            
-            if similarity_score > 0.3:  # Minimum similarity threshold
-                sale_with_score = sale.copy()
-                sale_with_score["similarity_score"] = similarity_score
-                sale_with_score["price_per_quality"] = sale.get("price", 0) / max(sale.get("quality_score", 0.5), 0.1)
-                comparable_with_scores.append(sale_with_score)
-        
-        # Sort by similarity score and recency
-        comparable_with_scores.sort(
-            key=lambda x: (x["similarity_score"], x.get("timestamp", 0)), 
-            reverse=True
-        )
+        # Minimum similarity threshold
+        candidates = np.flatnonzero(scores > 0.3)
+        
+        # Sort by similarity score and recency, keep the top 10 most similar
+        top = candidates[np.lexsort((-timestamps[candidates], -scores[candidates]))][:10]
         
-        # Return top 10 most similar
-        return comparable_with_scores[:10]
+        comparable_with_scores = []
+        for i in top:
+            sale = historical_data[i]
+            sale_with_score = sale.copy()
+            sale_with_score["similarity_score"] = float(scores[i])
+            sale_with_score["price_per_quality"] = sale.get("price", 0) / max(sale.get("quality_score", 0.5), 0.1)
+            comparable_with_scores.append(sale_with_score)
+        
+        return comparable_with_scores
     
-    def _calculate_similarity_score(
+    def _calculate_similarity_scores(
         self, 
         target_metadata: Dict[str, Any], 
-        sale_metadata: Dict[str, Any]
-    ) -> float:
-        """Calculate similarity score between target and historical sale"""
-        
-        score = 0.0
-        
-        # Category match (40% weight)
-        if target_metadata.get("category") == sale_metadata.get("category"):
-            score += 0.4
-        
-        # Creator match (20% weight)
-        if target_metadata.get("creator") == sale_metadata.get("creator"):
-            score += 0.2
-        
-        # Quality score similarity (20% weight)
-        target_quality = target_metadata.get("quality_score", 0.5)
-        sale_quality = sale_metadata.get("quality_score", 0.5)
-        quality_similarity = 1 - abs(target_quality - sale_quality)
-        score += quality_similarity * 0.2
+        sales_soa: Dict[str, np.ndarray],
+    ) -> np.ndarray:
+        """Calculate similarity scores between target and each historical sale"""
+        
+        return _similarity_kernel(
+            sales_soa["category"] == target_metadata.get("category"),
+            sales_soa["creator"] == target_metadata.get("creator"),
+            sales_soa["quality_score"],
+            sales_soa["rarity"],
+            sales_soa["timestamp"],
+            float(target_metadata.get("quality_score", 0.5)),
+            float(target_metadata.get("rarity", 0.5)),
+            time.time(),
+        )
+    
+    def _warm_up_kernels(self):
+        """Run the JIT kernels once on a one-row dummy input"""
+        self._calculate_similarity_scores({}, self._historical_to_soa([{}]))
+    
+    @staticmethod
+    def _historical_to_soa(historical_data: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Convert historical sales records into per-field column arrays"""
         
-        # Rarity similarity (10% weight)
-        target_rarity = target_metadata.get("rarity", 0.5)
-        sale_rarity = sale_metadata.get("rarity", 0.5)
-        rarity_similarity = 1 - abs(target_rarity - sale_rarity)
-        score += rarity_similarity * 0.1
+        n = len(historical_data)
         
-        # Time decay (10% weight) - more recent sales are more relevant
-        sale_timestamp = sale_metadata.get("timestamp", 0)
-        current_timestamp = time.time()
-        days_ago = (current_timestamp - sale_timestamp) / (24 * 3600)
-        time_relevance = max(0, 1 - (days_ago / 365))  # Decay over 1 year
-        score += time_relevance * 0.1
+        def column(key: str, default: Any, dtype=np.float64) -> np.ndarray:
+            return np.fromiter(
+                (record.get(key, default) for record in historical_data), dtype=dtype, count=n
+            )
         
-        return min(score, 1.0)
+        return {
+            "price": column("price", 0),
+            "volume": column("volume", 0),
+            "quality_score": column("quality_score", 0.5),
+            "rarity": column("rarity", 0.5),
+            "timestamp": column("timestamp", 0),
+            "category": column("category", None, dtype=object),
+            "creator": column("creator", None, dtype=object),
+        }
     
     async def _calculate_explainable_factors(
         self,
-        features: torch.Tensor,
+        summary: FeatureSummary,
         metadata: Dict[str, Any],
         market_data: Dict[str, Any],
         estimated_value: float,
     ) -> Dict[str, Any]:
         """Calculate explainable valuation factors with impact analysis"""
         
-        features_list = features.tolist()
-        
         # Base factors with normalized scores
         base_factors = {
             "creator_reputation": {
-                "score": round(features_list[0], 3),
-                "impact": self._calculate_factor_impact("creator_reputation", features_list[0]),
+                "score": round(summary.creator_reputation, 3),
+                "impact": self._calculate_factor_impact("creator_reputation", summary.creator_reputation),
                 "description": "Creator's historical performance and reputation score",
             },
             "content_quality": {
-                "score": round(features_list[1], 3),
-                "impact": self._calculate_factor_impact("content_quality", features_list[1]),
+                "score": round(summary.content_quality, 3),
+                "impact": self._calculate_factor_impact("content_quality", summary.content_quality),
                 "description": "Technical and artistic quality assessment",
             },
             "category_popularity": {
-                "score": round(features_list[2], 3),
-                "impact": self._calculate_factor_impact("category_popularity", features_list[2]),
+                "score": round(summary.category_popularity, 3),
+                "impact": self._calculate_factor_impact("category_popularity", summary.category_popularity),
                 "description": "Current market demand for this content category",
             },
             "rarity": {
-                "score": round(features_list[3], 3),
-                "impact": self._calculate_factor_impact("rarity", features_list[3]),
+                "score": round(summary.rarity, 3),
+                "impact": self._calculate_factor_impact("rarity", summary.rarity),
                 "description": "Uniqueness and scarcity of the content",
             },
             "market_sentiment": {
-                "score": round(features_list[-6], 3),
-                "impact": self._calculate_factor_impact("market_sentiment", features_list[-6]),
+                "score": round(summary.market_sentiment, 3),
+                "impact": self._calculate_factor_impact("market_sentiment", summary.market_sentiment),
                 "description": "Overall market sentiment and trends",
             },
         }
@@ -753,8 +1120,8 @@ class ValuationService:
         # Market-specific factors
         market_factors = {
             "liquidity": {
-                "score": round(features_list[-3], 3),
-                "impact": self._calculate_factor_impact("liquidity", features_list[-3]),
+                "score": round(summary.liquidity, 3),
+                "impact": self._calculate_factor_impact("liquidity", summary.liquidity),
                 "description": "Market liquidity and trading activity",
             },
             "volatility": {
@@ -768,7 +1135,7 @@ class ValuationService:
         historical_factors = await self._analyze_historical_performance(metadata, estimated_value)
         
         # Risk assessment
-        risk_factors = self._assess_valuation_risks(features, market_data)
+        risk_factors = self._assess_valuation_risks(summary, market_data)
         
         return {
             "base_factors": base_factors,
@@ -781,21 +1148,11 @@ class ValuationService:
     def _calculate_factor_impact(self, factor_name: str, score: float) -> str:
         """Calculate the impact of a factor on valuation"""
         
-        # Define thresholds for each factor
-        thresholds = {
-            "creator_reputation": {"high": 0.7, "low": 0.3},
-            "content_quality": {"high": 0.8, "low": 0.4},
-            "category_popularity": {"high": 0.6, "low": 0.3},
-            "rarity": {"high": 0.7, "low": 0.3},
-            "market_sentiment": {"high": 0.6, "low": 0.4},
-            "liquidity": {"high": 0.5, "low": 0.2},
-        }
+        high, low = FACTOR_IMPACT_THRESHOLDS.get(factor_name, (0.6, 0.4))
         
-        threshold = thresholds.get(factor_name, {"high": 0.6, "low": 0.4})
-        
-        if score >= threshold["high"]:
+        if score >= high:
             return "positive"
-        elif score <= threshold["low"]:
+        elif score <= low:
             return "negative"
         else:
             return "neutral"
@@ -825,35 +1182,36 @@ class ValuationService:
     
     def _assess_valuation_risks(
         self, 
-        features: torch.Tensor, 
+        summary: FeatureSummary, 
         market_data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Assess various risks affecting valuation"""
         
         return {
             "market_risk": "high" if market_data.get("market_volatility", 0.2) > 0.4 else "medium",
-            "liquidity_risk": "high" if features[-3] < 0.3 else "low",
-            "creator_risk": "high" if features[0] < 0.3 else "low",
-            "category_risk": "high" if features[2] < 0.3 else "medium",
-            "overall_risk_score": self._calculate_overall_risk_score(features, market_data),
+            "liquidity_risk": "high" if summary.liquidity < 0.3 else "low",
+            "creator_risk": "high" if summary.creator_reputation < 0.3 else "low",
+            "category_risk": "high" if summary.category_popularity < 0.3 else "medium",
+            "overall_risk_score": self._calculate_overall_risk_score(summary, market_data),
         }
     
     def _calculate_overall_risk_score(
         self, 
-        features: torch.Tensor, 
+        summary: FeatureSummary, 
         market_data: Dict[str, Any]
     ) -> float:
         """Calculate overall risk score (0-1, higher = riskier)"""
         
         risk_factors = [
-            1 - features[0],  # Creator reputation risk
-            1 - features[1],  # Quality risk
-            1 - features[2],  # Category risk
+            1 - summary.creator_reputation,  # Creator reputation risk
+            1 - summary.content_quality,  # Quality risk
+            1 - summary.category_popularity,  # Category risk
             market_data.get("market_volatility", 0.2),  # Market volatility
-            1 - features[-3],  # Liquidity risk
+            1 - summary.liquidity,  # Liquidity risk
         ]
         
-        return round(np.mean(risk_factors), 3)
+        # Plain float mean; np.mean costs more than the arithmetic for five values
+        return round(sum(risk_factors) / len(risk_factors), 3)
     
     def _calculate_overall_confidence(
         self, 
@@ -884,14 +1242,19 @@ class ValuationService:
         if not comparable_sales:
             return estimated_value
         
-        # Get price range from comparable sales
-        prices = [sale.get("price", 0) for sale in comparable_sales if sale.get("price", 0) > 0]
+        # Get price range from comparable sales (positive prices only)
+        prices = np.fromiter(
+            (sale.get("price", 0) for sale in comparable_sales),
+            dtype=np.float64,
+            count=len(comparable_sales),
+        )
+        prices = prices[prices > 0]
         
-        if not prices:
+        if not prices.size:
             return estimated_value
         
-        min_price = min(prices)
-        max_price = max(prices)
+        min_price = prices.min()
+        max_price = prices.max()
         median_price = np.median(prices)
         
         # Apply bounds with some flexibility
@@ -906,7 +1269,30 @@ class ValuationService:
         
         return estimated_value
     
+    async def _refresh_reference_data(self):
+        """Periodically reload category popularity and expire creator reputations"""
+        while True:
+            await asyncio.sleep(self._reference_data_refresh_interval)
+            try:
+                self._category_popularity = self._load_category_popularity()
+                self._creator_reputation.clear()
+            except Exception as e:
+                logger.warning("Failed to refresh reference data", error=str(e))
+    
     async def _get_creator_reputation(self, creator_address: str) -> float:
+        """Look up creator reputation, resolving and caching unseen creators"""
+        score = self._creator_reputation.get(creator_address)
+        if score is not None:
+            self._creator_reputation.move_to_end(creator_address)
+            return score
+        
+        score = await self._fetch_creator_reputation(creator_address)
+        self._creator_reputation[creator_address] = score
+        if len(self._creator_reputation) > self._creator_reputation_size:
+            self._creator_reputation.popitem(last=False)
+        return score
+    
+    async def _fetch_creator_reputation(self, creator_address: str) -> float:
         """Get creator reputation score from on-chain data"""
         
         if not self.w3 or not creator_address:
@@ -920,20 +1306,13 @@ class ValuationService:
             logger.warning("Failed to get creator reputation", error=str(e))
             return 0.5
     
-    async def _get_category_popularity(self, category: str) -> float:
+    def _get_category_popularity(self, category: str) -> float:
         """Get category popularity score"""
-        
-        # Category popularity mapping (mock data)
-        popularity = {
-            "music": 0.85,
-            "video": 0.80,
-            "art": 0.75,
-            "ebook": 0.60,
-            "course": 0.70,
-            "software": 0.65,
-        }
-        
-        return popularity.get(category.lower(), 0.5)
+        return self._category_popularity.get(category.lower(), 0.5)
+    
+    def _load_category_popularity(self) -> Dict[str, float]:
+        """Load the category popularity table"""
+        return CATEGORY_POPULARITY
     
     def _get_market_sentiment(self) -> float:
         """Get current market sentiment (0-1)"""
@@ -947,72 +1326,48 @@ class ValuationService:
         # For now, return neutral
         return 0.5
     
-    async def _submit_to_chainlink(self, token_id: int, estimated_value: float):
-        """Submit valuation result to Chainlink Oracle"""
-        
-        if not self.w3 or not settings.chainlink_oracle_address:
-            logger.warning("Chainlink oracle not configured, skipping submission")
+    def _start_metrics_worker(self):
+        """Start the metrics consumer on the running event loop"""
+        if self._metrics_worker is not None and not self._metrics_worker.done():
             return
-        
+        self._metrics_queue = asyncio.Queue(maxsize=self._metrics_queue_size)
+        self._metrics_worker = asyncio.get_running_loop().create_task(self._run_metrics_worker())
+    
+    async def _stop_metrics_worker(self):
+        """Apply queued metrics updates, then stop the consumer"""
+        if self._metrics_worker is None:
+            return
+        if not self._metrics_worker.done():
+            await self._metrics_queue.join()
+        self._metrics_worker.cancel()
         try:
-            # Load oracle contract ABI
-            oracle_abi = self._get_oracle_abi()
-            
-            oracle_contract = self.w3.eth.contract(
-                address=settings.chainlink_oracle_address,
-                abi=oracle_abi,
-            )
-            
-            # Convert value to wei (assuming 18 decimals)
-            value_wei = self.w3.to_wei(estimated_value, 'ether')
-            
-            # Prepare transaction
-            # Note: In production, use proper key management (Vault, KMS)
-            if not self.account:
-                logger.warning("No account configured for oracle submission")
-                return
-            
-            tx = oracle_contract.functions.submitValuation(
-                token_id,
-                value_wei,
-            ).build_transaction({
-                'from': self.account.address,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                'gas': 200000,
-                'gasPrice': self.w3.eth.gas_price,
-            })
-            
-            # Sign and send transaction
-            signed_tx = self.account.sign_transaction(tx)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            
-            logger.info(
-                "Valuation submitted to Chainlink",
-                token_id=token_id,
-                tx_hash=tx_hash.hex(),
-            )
-        
-        except Exception as e:
-            logger.error("Failed to submit to Chainlink oracle", error=str(e))
-            # Don't raise - oracle submission is optional
+            await self._metrics_worker
+        except asyncio.CancelledError:
+            pass
+        self._metrics_worker = None
     
-    def _get_oracle_abi(self) -> List[Dict]:
-        """Get Chainlink Oracle contract ABI"""
+    async def _run_metrics_worker(self):
+        while True:
+            estimated_value, features = await self._metrics_queue.get()
+            try:
+                await self._update_model_metrics(estimated_value, features)
+            finally:
+                self._metrics_queue.task_done()
+    
+    async def _record_metrics(self, estimated_value: float, features: np.ndarray):
+        """Hand a metrics update to the background consumer"""
+        worker = self._metrics_worker
+        if worker is None or worker.done() or worker.get_loop() is not asyncio.get_running_loop():
+            # No consumer on this loop, update inline
+            await self._update_model_metrics(estimated_value, features)
+            return
         
-        # Simplified ABI for valuation submission
-        return [
-            {
-                "inputs": [
-                    {"name": "tokenId", "type": "uint256"},
-                    {"name": "value", "type": "uint256"},
-                ],
-                "name": "submitValuation",
-                "outputs": [],
-                "stateMutability": "nonpayable",
-                "type": "function",
-            }
-        ]
-    async def _update_model_metrics(self, estimated_value: float, features: torch.Tensor):
+        try:
+            self._metrics_queue.put_nowait((estimated_value, features))
+        except asyncio.QueueFull:
+            logger.warning("Metrics queue full, dropping update")
+    
+    async def _update_model_metrics(self, estimated_value: float, features: np.ndarray):
         """Update model performance metrics"""
         try:
             self.model_metrics["prediction_count"] += 1
@@ -1048,34 +1403,22 @@ class ValuationService:
             logger.warning("Failed to get historical training data", error=str(e))
             return []
     
-    def _extract_features_array(self, data: Dict[str, Any]) -> List[float]:
-        """Extract feature array from data record"""
-        return [
+    def _write_features(self, row: np.ndarray, data: Dict[str, Any]):
+        """Write a data record's features into a zero-initialized 30-wide row"""
+        row[0:3] = (
             data.get("creator_reputation", 0.5),
             data.get("quality_score", 0.5),
             data.get("rarity", 0.5),
             # Add more features as needed
-        ] + [0.0] * 27  # Pad to 30 features
+        )
     
     async def _get_category_volume(self, category: str) -> float:
         """Get 24h trading volume for category"""
-        try:
-            # In production, query from analytics database
-            volumes = {"music": 50000, "art": 75000, "video": 30000, "ebook": 15000}
-            return volumes.get(category, 25000)
-        except Exception as e:
-            logger.warning("Failed to get category volume", error=str(e))
-            return 25000
+        return CATEGORY_VOLUMES_24H.get(category, 25000)
     
     async def _get_category_avg_price(self, category: str) -> float:
         """Get average price for category"""
-        try:
-            # In production, query from analytics database
-            avg_prices = {"music": 2500, "art": 5000, "video": 3000, "ebook": 1500}
-            return avg_prices.get(category, 2000)
-        except Exception as e:
-            logger.warning("Failed to get category average price", error=str(e))
-            return 2000
+        return CATEGORY_AVG_PRICES.get(category, 2000)
     
     async def _get_market_volatility(self) -> float:
         """Get current market volatility"""
@@ -1147,10 +1490,10 @@ class ValuationService:
         try:
             # In production, query from creator analytics
             return {
-                "avg_price": np.random.lognormal(8, 0.3),
-                "success_rate": np.random.beta(3, 2),
-                "total_sales": np.random.randint(5, 50),
-                "reputation_trend": np.random.choice(["increasing", "stable", "decreasing"]),
+                "avg_price": self._rng.lognormal(8, 0.3),
+                "success_rate": self._rng.beta(3, 2),
+                "total_sales": self._rng.integers(5, 50),
+                "reputation_trend": self._rng.choice(["increasing", "stable", "decreasing"]),
             }
         except Exception as e:
             logger.warning("Failed to get creator historical performance", error=str(e))
@@ -1161,9 +1504,9 @@ class ValuationService:
         try:
             # In production, analyze category performance over time
             return {
-                "growth_rate": np.random.normal(0.1, 0.2),  # 10% average growth with variance
-                "trend_direction": np.random.choice(["up", "stable", "down"]),
-                "volatility": np.random.beta(2, 5),
+                "growth_rate": self._rng.normal(0.1, 0.2),  # 10% average growth with variance
+                "trend_direction": self._rng.choice(["up", "stable", "down"]),
+                "volatility": self._rng.beta(2, 5),
             }
         except Exception as e:
             logger.warning("Failed to get category trends", error=str(e))
@@ -1178,42 +1521,64 @@ class ValuationService:
                 logger.warning("Insufficient training data", data_size=len(training_data))
                 return
             
-            # Prepare training data
-            X = []
-            y = []
+            # Prepare training data in preallocated arrays, keeping rows with a price
+            X = np.zeros((len(training_data), 30), dtype=np.float32)
+            y = np.zeros(len(training_data))
+            n_valid = 0
             
             for record in training_data:
-                features = self._extract_features_array(record)
                 price = record.get("price", 0)
                 
                 if price > 0:
-                    X.append(features)
-                    y.append(np.log(price))  # Log transform for neural network
+                    self._write_features(X[n_valid], record)
+                    y[n_valid] = np.log(price)  # Log transform for neural network
+                    n_valid += 1
             
-            if len(X) < 50:
-                logger.warning("Insufficient valid training samples", valid_samples=len(X))
+            if n_valid < 50:
+                logger.warning("Insufficient valid training samples", valid_samples=n_valid)
                 return
             
-            X = np.array(X)
-            y = np.array(y)
+            X = X[:n_valid]
+            y = y[:n_valid]
             
-            # Update scaler
-            self.scaler.fit(X)
-            X_scaled = self.scaler.transform(X)
+            # Fit a fresh scaler and fresh estimators off the event loop; the
+            # serving ones keep answering requests until everything is swapped in
+            def fit_scaler() -> Tuple[StandardScaler, np.ndarray]:
+                scaler = StandardScaler()
+                return scaler, scaler.fit_transform(X)
+            
+            scaler, X_scaled = await asyncio.to_thread(fit_scaler)
             
             # Train ensemble models
+            ensemble_model = None
+            ensemble_sessions = None
             if self.ensemble_model:
-                # Train Random Forest
-                self.ensemble_model['random_forest'].fit(X_scaled, np.exp(y))  # Original scale
-                rf_score = self.ensemble_model['random_forest'].score(X_scaled, np.exp(y))
+                y_exp = np.exp(y)  # Original scale
+                ensemble_model = {
+                    name: clone(model) for name, model in self.ensemble_model.items()
+                }
                 
-                # Train Gradient Boosting
-                self.ensemble_model['gradient_boosting'].fit(X_scaled, np.exp(y))
-                gb_score = self.ensemble_model['gradient_boosting'].score(X_scaled, np.exp(y))
+                def fit_and_score(model) -> float:
+                    model.fit(X_scaled, y_exp)
+                    return model.score(X_scaled, y_exp)
+                
+                # Random Forest and Gradient Boosting release the GIL in native
+                # code, so fit the clones concurrently
+                rf_score, gb_score = await asyncio.gather(
+                    asyncio.to_thread(fit_and_score, ensemble_model['random_forest']),
+                    asyncio.to_thread(fit_and_score, ensemble_model['gradient_boosting']),
+                )
                 
                 logger.info("Ensemble models trained", rf_score=rf_score, gb_score=gb_score)
+                ensemble_sessions = await asyncio.to_thread(
+                    self._build_ensemble_sessions, ensemble_model
+                )
             
-            # Train neural network (simplified training loop)
+            # Train neural network (simplified training loop). Requests are
+            # served by inference_model / neural_session, so training the
+            # weights in place does not affect them until the swap below.
+            inference_model = None
+            neural_session = None
             if self.neural_model:
                 self.neural_model.train()
                 optimizer = torch.optim.Adam(self.neural_model.parameters(), lr=0.001)
@@ -1222,11 +1587,33 @@ class ValuationService:
                 X_tensor = torch.tensor(X_scaled, dtype=torch.float32)
                 y_tensor = torch.tensor(y, dtype=torch.float32).unsqueeze(1)
                 
+                # Compiled wrapper shares parameters with neural_model, so the
+                # optimizer and the saved state_dict are unaffected. Compilation
+                # happens on the first call, so warm it up here to fall back early.
+                train_model = self.neural_model
+                if settings.valuation_compile_model:
+                    try:
+                        compiled = torch.compile(self.neural_model)
+                        with torch.autocast(
+                            device_type="cpu",
+                            dtype=torch.bfloat16,
+                            enabled=settings.valuation_train_bf16,
+                        ):
+                            compiled(X_tensor)
+                        train_model = compiled
+                    except Exception as e:
+                        logger.warning("torch.compile unavailable, training eagerly", error=str(e))
+                
                 # Simple training loop
                 for epoch in range(100):
                     optimizer.zero_grad()
-                    value_pred, uncertainty_pred = self.neural_model(X_tensor)
-                    loss = criterion(value_pred, y_tensor)
+                    with torch.autocast(
+                        device_type="cpu",
+                        dtype=torch.bfloat16,
+                        enabled=settings.valuation_train_bf16,
+                    ):
+                        value_pred, uncertainty_pred = train_model(X_tensor)
+                    loss = criterion(value_pred.float(), y_tensor)
                     loss.backward()
                     optimizer.step()
                     
@@ -1234,8 +1621,21 @@ class ValuationService:
                         logger.info(f"Training epoch {epoch}, loss: {loss.item():.4f}")
                 
                 self.neural_model.eval()
+                inference_model = self._build_inference_model()
+                neural_session = self._build_neural_session()
                 logger.info("Neural network model trained")
             
+            # Swap the scaler and every model together, with no await in
+            # between, so no request mixes old and new parameters
+            self.scaler = scaler
+            self._cache_scaler_params()
+            if ensemble_model is not None:
+                self.ensemble_model = ensemble_model
+                self.ensemble_sessions = ensemble_sessions
+            if inference_model is not None:
+                self.inference_model = inference_model
+                self.neural_session = neural_session
+            
             # Update model metrics
             self.model_metrics["last_updated"] = datetime.now().isoformat()
             self.model_metrics["training_samples"] = len(X)
@@ -1270,6 +1670,20 @@ class ValuationService:
         except Exception as e:
             logger.warning("Failed to save models", error=str(e))
     
+    async def close(self):
+        """Stop background workers"""
+        await self._neural_batcher.stop()
+        await self._ensemble_batcher.stop()
+        await self._stop_metrics_worker()
+        
+        if self._reference_data_task is not None:
+            self._reference_data_task.cancel()
+            try:
+                await self._reference_data_task
+            except asyncio.CancelledError:
+                pass
+            self._reference_data_task = None
+    
     def get_model_performance_metrics(self) -> Dict[str, Any]:
         """Get current model performance metrics"""
         return {
@@ -1,12 +1,16 @@
 """Vector Database Service for storing and querying content fingerprints"""
 
+import asyncio
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+import faiss
+from typing import Dict, List, Optional, Tuple, Union
 import structlog
-import asyncio
+import time
 from dataclasses import dataclass
 import json
 import hashlib
+import os
+import pickle
 
 logger = structlog.get_logger()
 
@@ -15,18 +19,55 @@ logger = structlog.get_logger()
 class VectorRecord:
     """Vector record for storage"""
     id: str
-    vector: List[float]
+    vector: Union[List[float], np.ndarray]  # Read-only row view when returned by get_vector
     metadata: Dict
-    timestamp: float
+    timestamp: float  # Wall-clock time.time(), so it stays meaningful after save()/load()
 
 
 class VectorDBService:
     """Service for managing vector database operations"""
     
     def __init__(self):
-        self.vectors = {}  # In-memory storage for now
-        self.index = None  # Will use FAISS or similar for production
         self.dimension = 512  # Standard feature dimension
+        self.hnsw_m = 32  # Graph neighbours per node
+        self.exact_search_max_rows = 10000  # Below this, one matrix-vector product beats HNSW
+        # Above this, switch to IVF-PQ: 64-byte codes per vector instead of a float32 copy
+        # in the HNSW graph; it also needs this many vectors to train its codebooks
+        self.pq_min_rows = 40000
+        self.ivf_nlist = 4096  # Inverted lists, capped at ~39 training vectors per list
+        self.ivf_nprobe = 16  # Lists scanned per query, recall/speed trade-off
+        self.pq_m = 64  # Sub-quantizers, 8 bits each
+        self.pq_rerank_factor = 4  # PQ candidates per result, rescored exactly from the matrix
+        self.index = None  # FAISS HNSW or IVF-PQ index, rows aligned with the matrix
+        self._index_stale = False  # Neither index can delete or overwrite, rebuild before next search
+        self._mapped_index_path = None  # Set while the index is a read-only mapping of a saved file
+        self._row_mutations = 0  # Bumped by deletes and overwrites, which invalidate index rows
+        self._reset_storage()
+        
+    def _reset_storage(self):
+        """Clear the column storage"""
+        # Unit vectors live in one float32 buffer grown by doubling; row i belongs to ids[i]
+        self._buffer = np.empty((0, self.dimension), dtype=np.float32)
+        self.count = 0
+        self.ids: List[str] = []
+        self.meta: List[Dict] = []
+        self.timestamps: List[float] = []
+        self.id_to_row: Dict[str, int] = {}
+        self._pq_training_task = None  # Background IVF-PQ training; a replaced task discards its index
+    
+    @property
+    def matrix(self) -> np.ndarray:
+        """(count, dimension) view of the stored unit vectors"""
+        return self._buffer[:self.count]
+    
+    def _ensure_capacity(self, rows: int):
+        """Grow the buffer to hold at least rows vectors, copying a read-only mapping to RAM"""
+        if rows <= len(self._buffer) and self._buffer.flags.writeable:
+            return
+        capacity = max(rows, 2 * len(self._buffer), 1024)
+        buffer = np.empty((capacity, self.dimension), dtype=np.float32)
+        buffer[:self.count] = self._buffer[:self.count]
+        self._buffer = buffer
         
     async def initialize(self):
         """Initialize vector database"""
@@ -35,7 +76,8 @@ class VectorDBService:
             
             # In production, this would connect to Weaviate, Pinecone, or FAISS
             # For now, use in-memory storage
-            self.vectors = {}
+            self._reset_storage()
+            self._reset_index()
             
             logger.info("Vector database initialized successfully")
         except Exception as e:
@@ -45,33 +87,34 @@ class VectorDBService:
     async def store_vector(
         self,
         content_id: str,
-        vector: List[float],
+        vector: Union[List[float], np.ndarray],
         metadata: Dict
     ) -> bool:
         """Store a vector with metadata"""
         try:
-            # Normalize vector
-            vector_array = np.array(vector)
-            if len(vector_array) != self.dimension:
-                # Pad or truncate to standard dimension
-                if len(vector_array) < self.dimension:
-                    vector_array = np.pad(vector_array, (0, self.dimension - len(vector_array)))
-                else:
-                    vector_array = vector_array[:self.dimension]
+            vector_array = self._to_unit_vector(vector)
             
-            # Normalize to unit vector
-            norm = np.linalg.norm(vector_array)
-            if norm > 0:
-                vector_array = vector_array / norm
+            timestamp = time.time()
             
-            record = VectorRecord(
-                id=content_id,
-                vector=vector_array.tolist(),
-                metadata=metadata,
-                timestamp=asyncio.get_event_loop().time()
-            )
-            
-            self.vectors[content_id] = record
+            row = self.id_to_row.get(content_id)
+            if row is not None:
+                # Overwrite in place
+                self._ensure_capacity(self.count)
+                self._buffer[row] = vector_array
+                self.meta[row] = metadata
+                self.timestamps[row] = timestamp
+                self._mark_index_stale()
+            else:
+                row = self.count
+                self._ensure_capacity(row + 1)
+                self._buffer[row] = vector_array
+                self.ids.append(content_id)
+                self.meta.append(metadata)
+                self.timestamps.append(timestamp)
+                self.id_to_row[content_id] = row
+                self.count += 1
+                if not self._index_stale:
+                    self._add_to_index(self._buffer[row:row + 1])
             
             logger.info("Vector stored successfully", content_id=content_id)
             return True
@@ -80,58 +123,104 @@ class VectorDBService:
             logger.error("Failed to store vector", content_id=content_id, error=str(e))
             return False
     
+    def _to_unit_vector(self, vector: Union[List[float], np.ndarray]) -> np.ndarray:
+        """Pad or truncate to the standard dimension and normalize, in float32"""
+        # float32 end to end so similarity math runs on sgemm/sgemv, not the float64 variants
+        vector_array = np.asarray(vector, dtype=np.float32)
+        if len(vector_array) != self.dimension:
+            # Pad or truncate to standard dimension
+            if len(vector_array) < self.dimension:
+                vector_array = np.pad(vector_array, (0, self.dimension - len(vector_array)))
+            else:
+                vector_array = vector_array[:self.dimension]
+        
+        # Normalize to unit vector
+        norm = np.linalg.norm(vector_array)
+        if norm > 0:
+            vector_array = vector_array / norm
+        
+        return vector_array
+    
     async def search_similar(
         self,
-        query_vector: List[float],
+        query_vector: Union[List[float], np.ndarray],
         threshold: float = 0.8,
         limit: int = 10
     ) -> List[Tuple[str, float, Dict]]:
         """Search for similar vectors"""
         try:
-            if not self.vectors:
+            if not self.count:
                 return []
             
-            # Normalize query vector
-            query_array = np.array(query_vector)
-            if len(query_array) != self.dimension:
-                if len(query_array) < self.dimension:
-                    query_array = np.pad(query_array, (0, self.dimension - len(query_array)))
-                else:
-                    query_array = query_array[:self.dimension]
+            query_array = self._to_unit_vector(query_vector)
             
-            norm = np.linalg.norm(query_array)
-            if norm > 0:
-                query_array = query_array / norm
+            k = min(limit, self.count)
             
-            similarities = []
-            
-            for record in self.vectors.values():
-                stored_vector = np.array(record.vector)
-                
-                # Calculate cosine similarity
-                similarity = np.dot(query_array, stored_vector)
-                
-                if similarity >= threshold:
-                    similarities.append((record.id, float(similarity), record.metadata))
+            # Inner product of unit vectors is cosine similarity
+            if self.count <= self.exact_search_max_rows:
+                scores, rows = self._exact_search(query_array, k)
+            else:
+                if self._index_stale:
+                    self._rebuild_index()
+                if self._needs_pq_index():
+                    # Keep answering from HNSW until the trained index is swapped in
+                    self._start_pq_training()
+                if isinstance(self.index, faiss.IndexIVFPQ):
+                    scores, rows = self._pq_search(query_array, k)
+                else:
+                    self.index.hnsw.efSearch = max(64, k)
+                    scores, rows = self.index.search(query_array.reshape(1, -1), k)
+                    scores, rows = scores[0], rows[0]
             
-            # Sort by similarity (descending)
-            similarities.sort(key=lambda x: x[1], reverse=True)
+            similarities = []
+            for similarity, row in zip(scores.tolist(), rows.tolist()):
+                if row < 0 or similarity < threshold:
+                    continue
+                similarities.append((self.ids[row], similarity, self.meta[row]))
             
-            return similarities[:limit]
+            return similarities
             
         except Exception as e:
             logger.error("Failed to search similar vectors", error=str(e))
             return []
     
     async def get_vector(self, content_id: str) -> Optional[VectorRecord]:
-        """Get a specific vector by ID"""
-        return self.vectors.get(content_id)
+        """Get a specific vector by ID
+        
+        The vector is a read-only view of the stored row; copy it if it must
+        outlive later writes to the same ID or deletes.
+        """
+        row = self.id_to_row.get(content_id)
+        if row is None:
+            return None
+        vector = self._buffer[row]
+        vector.flags.writeable = False
+        return VectorRecord(
+            id=content_id,
+            vector=vector,
+            metadata=self.meta[row],
+            timestamp=self.timestamps[row],
+        )
     
     async def delete_vector(self, content_id: str) -> bool:
         """Delete a vector"""
         try:
-            if content_id in self.vectors:
-                del self.vectors[content_id]
+            row = self.id_to_row.pop(content_id, None)
+            if row is not None:
+                # Move the last row into the freed slot
+                last = self.count - 1
+                if row != last:
+                    self._ensure_capacity(self.count)
+                    self._buffer[row] = self._buffer[last]
+                    self.ids[row] = self.ids[last]
+                    self.meta[row] = self.meta[last]
+                    self.timestamps[row] = self.timestamps[last]
+                    self.id_to_row[self.ids[row]] = row
+                self.ids.pop()
+                self.meta.pop()
+                self.timestamps.pop()
+                self.count = last
+                self._mark_index_stale()
                 logger.info("Vector deleted successfully", content_id=content_id)
                 return True
             return False
@@ -139,22 +228,211 @@ class VectorDBService:
             logger.error("Failed to delete vector", content_id=content_id, error=str(e))
             return False
     
+    def _exact_search(self, query_array: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows by inner product with a full scan, best first"""
+        similarities = self.matrix @ query_array
+        if k < len(similarities):
+            top = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top = np.arange(len(similarities))
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        return similarities[top], top
+    
+    def _pq_search(self, query_array: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows from IVF-PQ candidates, rescored exactly, best first"""
+        self.index.nprobe = self.ivf_nprobe
+        _, candidates = self.index.search(
+            query_array.reshape(1, -1), min(k * self.pq_rerank_factor, self.count)
+        )
+        candidates = candidates[0][candidates[0] >= 0]
+        # PQ distances are approximate; rank the shortlist by the stored unit vectors
+        similarities = self.matrix[candidates] @ query_array
+        top = np.argsort(-similarities, kind="stable")[:k]
+        return similarities[top], candidates[top]
+    
+    def _needs_pq_index(self) -> bool:
+        """Whether the collection has outgrown the HNSW index"""
+        return self.count >= self.pq_min_rows and not isinstance(self.index, faiss.IndexIVFPQ)
+    
+    def _train_pq_index(self, vectors: np.ndarray) -> faiss.IndexIVFPQ:
+        """Train an IVF-PQ index on vectors and add them to it"""
+        nlist = max(1, min(self.ivf_nlist, len(vectors) // 39))
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, self.pq_m, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add(vectors)
+        logger.info("Trained IVF-PQ index", vectors=len(vectors), nlist=nlist)
+        return index
+    
+    def _start_pq_training(self):
+        """Start training the IVF-PQ index in the background, unless it is already running"""
+        if self._pq_training_task is None or self._pq_training_task.done():
+            self._pq_training_task = asyncio.get_running_loop().create_task(self._build_pq_index())
+    
+    async def _build_pq_index(self):
+        """Train IVF-PQ on the current rows in a worker thread, then swap it in"""
+        # k-means and PQ codebooks over the whole collection take seconds; the
+        # rows are not copied, appends land beyond them and are added afterwards
+        vectors = self.matrix
+        mutations = self._row_mutations
+        try:
+            index = await asyncio.to_thread(self._train_pq_index, vectors)
+        except Exception as e:
+            logger.error("Failed to train IVF-PQ index", error=str(e))
+            return
+        
+        if self._pq_training_task is not asyncio.current_task() or self.count < self.pq_min_rows:
+            return  # Storage was reset or reloaded, or shrank below the threshold
+        
+        if self._row_mutations != mutations:
+            # Rows moved or changed under the trained index; re-encode them on the next search
+            self._index_stale = True
+        else:
+            index.add(self.matrix[len(vectors):])
+        self.index = index
+        self._mapped_index_path = None
+    
+    def _mark_index_stale(self):
+        """Record that index rows no longer match the matrix"""
+        self._index_stale = True
+        self._row_mutations += 1
+    
+    def _reset_index(self):
+        """Create an empty HNSW index"""
+        self.index = faiss.IndexHNSWFlat(self.dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        self._index_stale = False
+        self._mapped_index_path = None
+    
+    def _add_to_index(self, vectors: np.ndarray):
+        """Append matrix rows to the index"""
+        if self.index is None:
+            self._reset_index()
+        self._materialize_index()
+        self.index.add(vectors)
+    
+    def _materialize_index(self):
+        """Replace a read-only mapped index with an in-memory copy before modifying it"""
+        if self._mapped_index_path is not None:
+            self.index = faiss.read_index(self._mapped_index_path)
+            self._mapped_index_path = None
+    
+    def _rebuild_index(self):
+        """Rebuild the index from the matrix after deletes or overwrites"""
+        self._materialize_index()
+        if isinstance(self.index, faiss.IndexIVFPQ) and self.count >= self.pq_min_rows:
+            # Codebooks stay valid; only the encoded vectors are replaced
+            self.index.reset()
+            self._index_stale = False
+        else:
+            self._reset_index()
+        if self.count:
+            self._add_to_index(self.matrix)
+    
+    async def save(self, path: str):
+        """Persist vectors, records and any trained IVF-PQ index to a directory"""
+        os.makedirs(path, exist_ok=True)
+        # Copy mapped vectors to RAM first in case they map the files being overwritten
+        self._ensure_capacity(self.count)
+        np.save(os.path.join(path, "vectors.npy"), self.matrix)
+        with open(os.path.join(path, "records.pkl"), "wb") as f:
+            pickle.dump((self.ids, self.meta, self.timestamps), f, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        index_path = os.path.join(path, "index.faiss")
+        if isinstance(self.index, faiss.IndexIVFPQ):
+            self._materialize_index()
+            if self._index_stale:
+                self._rebuild_index()
+            faiss.write_index(self.index, index_path)
+        elif os.path.exists(index_path):
+            os.remove(index_path)
+        
+        logger.info("Vector database saved", path=path, vectors=self.count)
+    
+    async def load(self, path: str):
+        """Load a saved directory, memory-mapping the vectors instead of reading them into RAM
+        
+        The mapping is read-only; the first write copies the vectors into memory.
+        """
+        self._buffer = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(path, "records.pkl"), "rb") as f:
+            self.ids, self.meta, self.timestamps = pickle.load(f)
+        self.count = len(self.ids)
+        self._pq_training_task = None
+        self.id_to_row = {content_id: row for row, content_id in enumerate(self.ids)}
+        
+        index_path = os.path.join(path, "index.faiss")
+        if os.path.exists(index_path):
+            self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+            self._mapped_index_path = index_path
+            self._index_stale = False
+        else:
+            # The HNSW graph is not persisted; rebuild it on the first indexed search
+            self.index = None
+            self._mapped_index_path = None
+            self._index_stale = True
+        
+        logger.info("Vector database loaded", path=path, vectors=self.count)
+    
     async def get_stats(self) -> Dict:
         """Get database statistics"""
         return {
-            "total_vectors": len(self.vectors),
+            "total_vectors": self.count,
             "dimension": self.dimension,
-            "memory_usage_mb": len(self.vectors) * self.dimension * 4 / (1024 * 1024),  # Rough estimate
+            "memory_usage_mb": self._buffer.nbytes / (1024 * 1024),
         }
     
     async def batch_store(self, records: List[Tuple[str, List[float], Dict]]) -> int:
         """Store multiple vectors in batch"""
-        success_count = 0
+        if not records:
+            return 0
+        
+        # Pad/truncate every vector into one (B, dimension) block
+        block = np.zeros((len(records), self.dimension), dtype=np.float32)
+        valid = np.zeros(len(records), dtype=bool)
+        for i, (content_id, vector, _) in enumerate(records):
+            try:
+                vector_array = np.asarray(vector, dtype=np.float32)[:self.dimension]
+                block[i, :len(vector_array)] = vector_array
+                valid[i] = True
+            except Exception as e:
+                logger.error("Failed to store vector", content_id=content_id, error=str(e))
+        
+        # Normalize all rows at once, leaving zero vectors as they are
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        np.divide(block, norms, out=block, where=norms > 0)
         
-        for content_id, vector, metadata in records:
-            if await self.store_vector(content_id, vector, metadata):
-                success_count += 1
+        timestamp = time.time()
         
+        # Existing IDs are overwritten in place; new IDs are appended in first-seen
+        # order, keeping the last vector given for each (same as sequential stores)
+        new_rows = {}
+        for i in np.flatnonzero(valid).tolist():
+            content_id, _, metadata = records[i]
+            row = self.id_to_row.get(content_id)
+            if row is not None:
+                self._ensure_capacity(self.count)
+                self._buffer[row] = block[i]
+                self.meta[row] = metadata
+                self.timestamps[row] = timestamp
+                self._mark_index_stale()
+            else:
+                new_rows[content_id] = i
+        
+        if new_rows:
+            start = self.count
+            batch_rows = list(new_rows.values())
+            self._ensure_capacity(start + len(batch_rows))
+            self._buffer[start:start + len(batch_rows)] = block[batch_rows]
+            for offset, content_id in enumerate(new_rows):
+                self.id_to_row[content_id] = start + offset
+            self.ids.extend(new_rows)
+            self.meta.extend(records[i][2] for i in batch_rows)
+            self.timestamps.extend([timestamp] * len(batch_rows))
+            self.count += len(batch_rows)
+            if not self._index_stale:
+                self._add_to_index(self._buffer[start:self.count])
+        
+        success_count = int(valid.sum())
         logger.info("Batch store completed", total=len(records), success=success_count)
         return success_count
     
@@ -162,52 +440,51 @@ class VectorDBService:
         """Find potential duplicate content"""
         duplicates = []
         
-        vector_items = list(self.vectors.items())
+        vectors = self.matrix
         
-        for i, (id1, record1) in enumerate(vector_items):
-            for id2, record2 in vector_items[i+1:]:
-                vector1 = np.array(record1.vector)
-                vector2 = np.array(record2.vector)
-                
-                similarity = np.dot(vector1, vector2)
-                
-                if similarity >= threshold:
-                    duplicates.append((id1, id2, float(similarity)))
+        # Pairwise cosine similarities in block x block tiles, so at most one
+        # tile of S is held at a time; tiles wholly below the diagonal are skipped
+        block = 4096
+        for row_start in range(0, self.count, block):
+            row_vectors = vectors[row_start:row_start + block]
+            hit_rows, hit_cols, hit_scores = [], [], []
+            
+            for col_start in range(row_start, self.count, block):
+                similarities = row_vectors @ vectors[col_start:col_start + block].T
+                # Keep only pairs above the diagonal, i.e. j > i
+                rows, cols = np.nonzero(
+                    np.triu(similarities >= threshold, k=row_start - col_start + 1)
+                )
+                hit_rows.append(rows + row_start)
+                hit_cols.append(cols + col_start)
+                hit_scores.append(similarities[rows, cols])
+            
+            # Report the row block's pairs in (i, j) order, as a full scan would
+            rows = np.concatenate(hit_rows)
+            cols = np.concatenate(hit_cols)
+            scores = np.concatenate(hit_scores)
+            order = np.lexsort((cols, rows))
+            for i, j, score in zip(rows[order].tolist(), cols[order].tolist(), scores[order].tolist()):
+                duplicates.append((self.ids[i], self.ids[j], score))
         
         return duplicates
     
     async def cluster_vectors(self, n_clusters: int = 10) -> Dict[int, List[str]]:
         """Cluster vectors for content analysis"""
         try:
-            if len(self.vectors) < n_clusters:
+            if self.count < n_clusters:
                 # Not enough data for clustering
-                return {0: list(self.vectors.keys())}
-            
-            # Simple k-means clustering (in production, use scikit-learn)
-            vectors = np.array([record.vector for record in self.vectors.values()])
-            content_ids = list(self.vectors.keys())
-            
-            # Initialize centroids randomly
-            centroids = vectors[np.random.choice(len(vectors), n_clusters, replace=False)]
-            
-            for _ in range(10):  # Max iterations
-                # Assign points to clusters
-                distances = np.sqrt(((vectors - centroids[:, np.newaxis])**2).sum(axis=2))
-                labels = np.argmin(distances, axis=0)
-                
-                # Update centroids
-                new_centroids = np.array([vectors[labels == i].mean(axis=0) for i in range(n_clusters)])
-                
-                # Check convergence
-                if np.allclose(centroids, new_centroids):
-                    break
-                    
-                centroids = new_centroids
+                return {0: list(self.ids)}
+            
+            # k-means in FAISS (C++/SIMD), 10 Lloyd iterations as before
+            kmeans = faiss.Kmeans(self.dimension, n_clusters, niter=10)
+            kmeans.train(self.matrix)
+            _, labels = kmeans.index.search(self.matrix, 1)
             
             # Group content IDs by cluster
-            clusters = {}
-            for i in range(n_clusters):
-                clusters[i] = [content_ids[j] for j, label in enumerate(labels) if label == i]
+            clusters = {i: [] for i in range(n_clusters)}
+            for content_id, label in zip(self.ids, labels.ravel().tolist()):
+                clusters[label].append(content_id)
             
             return clusters
             
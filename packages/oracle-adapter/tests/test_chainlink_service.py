@@ -0,0 +1,176 @@
+"""Tests for the Chainlink Oracle service"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+import requests
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+
+from src.config import settings
+from src.services.chainlink_service import ChainlinkOracleService, OrjsonHTTPProvider
+
+
+class FakeEth:
+    """Records sent transactions; sending a token ID in fail_with raises the mapped error"""
+
+    gas_price = 1
+    chain_id = 42161
+
+    def __init__(self, fail_with=None):
+        self.fail_with = dict(fail_with or {})
+        self.sent = []  # (token_id, nonce)
+
+    def get_transaction_count(self, address, block_identifier=None):
+        return 7
+
+    def send_raw_transaction(self, raw):
+        token_id, nonce = raw
+        if token_id in self.fail_with:
+            raise self.fail_with[token_id]
+        self.sent.append((token_id, nonce))
+        return bytes([len(self.sent)])
+
+
+def make_service(fail_with=None):
+    """Create a ready service whose web3 client, account and contract are fakes"""
+    service = ChainlinkOracleService()
+    service.initialized = True
+    service.w3 = SimpleNamespace(eth=FakeEth(fail_with))
+    service.account = SimpleNamespace(
+        address="0x0000000000000000000000000000000000000001",
+        sign_transaction=lambda tx: SimpleNamespace(rawTransaction=(tx["token_id"], tx["nonce"])),
+    )
+    service.oracle_contract = SimpleNamespace(functions=SimpleNamespace(
+        submitValuation=lambda token_id, value, confidence: SimpleNamespace(
+            build_transaction=lambda params: {**params, "token_id": token_id}
+        )
+    ))
+    return service
+
+
+def pending_token_ids(service):
+    """Token IDs of the queued valuations, oldest first"""
+    return [item[0] for item in service._pending_submissions]
+
+
+@pytest.fixture(autouse=True)
+def manual_flush(monkeypatch):
+    """Keep the background flush loop idle so tests drive flush_valuations themselves"""
+    monkeypatch.setattr(settings, "oracle_flush_interval_ms", 60_000)
+    monkeypatch.setattr(settings, "oracle_batch_size", 100)
+
+
+@pytest.mark.asyncio
+async def test_flush_sends_at_most_one_batch(monkeypatch):
+    """Test that a flush submits oracle_batch_size valuations with consecutive nonces"""
+    service = make_service()
+    for token_id in range(1, 6):
+        service.enqueue_valuation(str(token_id), 1000.0, 0.9)
+    monkeypatch.setattr(settings, "oracle_batch_size", 3)
+
+    tx_hashes = await service.flush_valuations()
+
+    assert len(tx_hashes) == 3
+    assert service.w3.eth.sent == [(1, 7), (2, 8), (3, 9)]
+    assert pending_token_ids(service) == ["4", "5"]
+    await service.close()
+    assert service.w3.eth.sent[3:] == [(4, 7), (5, 8)]
+
+
+@pytest.mark.asyncio
+async def test_transient_error_stops_batch_and_requeues_rest():
+    """Test that a transient error requeues the failed and untried valuations in order"""
+    service = make_service(fail_with={2: requests.exceptions.Timeout("timed out")})
+    for token_id in range(1, 5):
+        service.enqueue_valuation(str(token_id), 1000.0, 0.9)
+
+    await service.flush_valuations()
+
+    # Nothing after the timed-out send reuses its nonce
+    assert service.w3.eth.sent == [(1, 7)]
+    assert service._pending_submissions == [
+        ("2", 1000.0, 0.9, None, 1),
+        ("3", 1000.0, 0.9, None, 0),
+        ("4", 1000.0, 0.9, None, 0),
+    ]
+
+    service.w3.eth.fail_with.clear()
+    await service.flush_valuations()
+    assert service.w3.eth.sent[1:] == [(2, 7), (3, 8), (4, 9)]
+    assert service._pending_submissions == []
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_permanent_error_drops_only_that_valuation():
+    """Test that a non-transient error skips the valuation without consuming a nonce"""
+    service = make_service(fail_with={2: ValueError("execution reverted")})
+    for token_id in range(1, 4):
+        service.enqueue_valuation(str(token_id), 1000.0, 0.9)
+
+    await service.flush_valuations()
+
+    assert service.w3.eth.sent == [(1, 7), (3, 8)]
+    assert service._pending_submissions == []
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_valuation_dropped_after_max_attempts(monkeypatch):
+    """Test that a valuation failing transiently oracle_max_attempts times is dropped"""
+    monkeypatch.setattr(settings, "oracle_max_attempts", 2)
+    service = make_service(fail_with={1: ConnectionError("down")})
+    service.enqueue_valuation("1", 1000.0, 0.9)
+
+    await service.flush_valuations()
+    assert service._pending_submissions == [("1", 1000.0, 0.9, None, 1)]
+
+    await service.flush_valuations()
+    assert service._pending_submissions == []
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest(monkeypatch):
+    """Test that the pending queue is capped at oracle_max_pending, dropping the oldest"""
+    monkeypatch.setattr(settings, "oracle_max_pending", 3)
+    service = make_service()
+    for token_id in range(1, 6):
+        service.enqueue_valuation(str(token_id), 1000.0, 0.9)
+
+    assert pending_token_ids(service) == ["3", "4", "5"]
+    await service.close()
+
+
+@pytest.mark.parametrize("params", [
+    # Wider than 64 bits, so orjson defers to web3's encoder
+    [{"to": "0x0000000000000000000000000000000000000001", "value": 2**70, "data": HexBytes(b"\x01\x02")}, "latest"],
+    [AttributeDict({"data": HexBytes(b"\xff"), "gas": 200000}), "pending"],
+    None,
+])
+def test_orjson_provider_matches_stock_encoding(params):
+    """Test that the orjson provider encodes the same JSON-RPC request as web3's provider"""
+    stock = Web3.HTTPProvider("http://localhost:8545")
+    provider = OrjsonHTTPProvider("http://localhost:8545")
+
+    expected = json.loads(stock.encode_rpc_request("eth_call", params))
+    encoded = json.loads(provider.encode_rpc_request("eth_call", params))
+
+    # Request IDs only need to be unique per provider
+    assert isinstance(encoded.pop("id"), int)
+    expected.pop("id")
+    assert encoded == expected
+
+
+def test_orjson_provider_decodes_like_stock_provider():
+    """Test that responses decode to the same dict, big integers included"""
+    for raw in (
+        b'{"jsonrpc":"2.0","id":1,"result":{"balance":"0x10","gas":21000}}',
+        b'{"jsonrpc":"2.0","id":2,"result":{"big":1180591620717411303425}}',
+    ):
+        decoded = OrjsonHTTPProvider.decode_rpc_response(raw)
+        assert decoded == Web3.HTTPProvider.decode_rpc_response(raw)
+    assert decoded["result"]["big"] == 2**70 + 1
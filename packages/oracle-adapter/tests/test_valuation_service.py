@@ -0,0 +1,292 @@
+"""Tests for the valuation service inference path"""
+
+import asyncio
+import time
+import numpy as np
+import pytest
+import pytest_asyncio
+import torch
+import torch.nn as nn
+
+from src.config import settings
+from src.services.valuation_service import (
+    FeatureSummary,
+    InferenceBatcher,
+    ValuationService,
+    _similarity_kernel,
+)
+
+
+@pytest_asyncio.fixture
+async def valuation_service():
+    """Create valuation service instance with models loaded"""
+    service = ValuationService()
+    await service.load_model()
+    yield service
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_inference_model_has_no_dropout(valuation_service):
+    """Test that the inference model drops training-only layers"""
+    modules = list(valuation_service.inference_model.modules())
+
+    assert not any(isinstance(m, nn.Dropout) for m in modules)
+    assert not valuation_service.inference_model.training
+
+
+@pytest.mark.asyncio
+async def test_inference_model_matches_neural_model(valuation_service):
+    """Test that the inference model reproduces the eval-mode neural model"""
+    x = torch.randn(4, 30)
+
+    with torch.no_grad():
+        expected_value, expected_uncertainty = valuation_service.neural_model(x)
+        value, uncertainty = valuation_service.inference_model(x)
+
+    assert torch.allclose(value, expected_value, atol=1e-5)
+    assert torch.allclose(uncertainty, expected_uncertainty, atol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_inference_model_folds_batchnorm(valuation_service):
+    """Test that BatchNorm folded into Linear reproduces the eval-mode output"""
+    for m in valuation_service.neural_model.modules():
+        if isinstance(m, nn.BatchNorm1d):
+            m.running_mean.uniform_(-1, 1)
+            m.running_var.uniform_(0.5, 2)
+            m.weight.data.uniform_(0.5, 1.5)
+            m.bias.data.uniform_(-0.5, 0.5)
+
+    inference_model = valuation_service._build_inference_model()
+    x = torch.randn(4, 30)
+
+    with torch.no_grad():
+        expected_value, _ = valuation_service.neural_model(x)
+        value, _ = inference_model(x)
+
+    assert not any(isinstance(m, nn.BatchNorm1d) for m in inference_model.modules())
+    assert torch.allclose(value, expected_value, atol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_quantized_inference_model_is_close(valuation_service, monkeypatch):
+    """Test that int8 dynamic quantization stays close to the float model"""
+    monkeypatch.setattr(settings, "valuation_quantize_model", True)
+    quantized_model = valuation_service._build_inference_model()
+    x = torch.randn(16, 30)
+
+    with torch.no_grad():
+        expected_value, _ = valuation_service.inference_model(x)
+        value, _ = quantized_model(x)
+
+    assert not any(type(m) is nn.Linear for m in quantized_model.modules())
+    assert torch.allclose(value, expected_value, atol=0.05)
+
+
+@pytest.mark.asyncio
+async def test_onnx_neural_session_matches_torch(valuation_service, monkeypatch):
+    """Test that the ONNX Runtime network reproduces the torch inference model"""
+    monkeypatch.setattr(settings, "valuation_onnx_neural", True)
+    features = np.random.rand(6, 30).astype(np.float32)
+    expected_values, expected_uncertainties = valuation_service._run_torch_model(features)
+
+    session = valuation_service._build_neural_session()
+    value, uncertainty = session.run(None, {"features": valuation_service._scale(features)})
+
+    assert np.allclose(np.exp(value[:, 0]), expected_values, rtol=1e-4)
+    assert np.allclose(uncertainty[:, 0], expected_uncertainties, rtol=1e-4)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_inference_is_batched(valuation_service):
+    """Test that concurrent neural inference calls are coalesced into one batch"""
+    features = [np.random.rand(30).astype(np.float32) for _ in range(8)]
+    expected = valuation_service._predict_neural_batch(
+        np.stack(features)
+    )
+
+    calls = []
+    predict_fn = valuation_service._neural_batcher.predict_fn
+
+    def recording_predict(rows):
+        calls.append(len(rows))
+        return predict_fn(rows)
+
+    valuation_service._neural_batcher.predict_fn = recording_predict
+    results = await asyncio.gather(
+        *[valuation_service._run_neural_model(f) for f in features]
+    )
+
+    assert calls == [8]
+    for (value, uncertainty), (expected_value, expected_uncertainty) in zip(results, expected):
+        assert value == pytest.approx(expected_value, rel=1e-5)
+        assert uncertainty == pytest.approx(expected_uncertainty, rel=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_batcher_stop_fails_pending_predictions():
+    """Test that stopping the batcher fails queued and half-collected predictions"""
+    batcher = InferenceBatcher(lambda rows: rows.sum(axis=1), max_batch_size=8, max_wait_ms=10_000)
+    batcher.start()
+
+    tasks = [asyncio.create_task(batcher.submit(np.ones(30, dtype=np.float32))) for _ in range(3)]
+    await asyncio.sleep(0.01)  # worker is now waiting for more rows
+    await batcher.stop()
+
+    for result in await asyncio.gather(*tasks, return_exceptions=True):
+        assert isinstance(result, RuntimeError)
+
+
+@pytest.mark.asyncio
+async def test_scale_matches_scaler_transform(valuation_service):
+    """Test that the cached affine scaling matches StandardScaler.transform"""
+    features_np = np.random.rand(5, 30).astype(np.float32)
+
+    expected = valuation_service.scaler.transform(features_np)
+    scaled = valuation_service._scale(features_np)
+
+    assert scaled.dtype == np.float32
+    assert np.allclose(scaled, expected, atol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_load_model_warms_up_similarity_kernel(valuation_service):
+    """Test that the numba similarity kernel is compiled before the first valuation"""
+    assert _similarity_kernel.signatures
+
+
+def test_feature_summary_matches_features():
+    """Test that FeatureSummary reproduces the statistics read from the vector"""
+    features = np.random.rand(30).astype(np.float32)
+    features[27:] = 0
+
+    summary = FeatureSummary.from_features(features)
+
+    assert summary.mean == pytest.approx(float(features.mean()))
+    assert summary.nonzero_fraction == pytest.approx(0.9)
+    assert summary.creator_reputation == pytest.approx(float(features[0]))
+    assert summary.market_sentiment == pytest.approx(float(features[-6]))
+    assert summary.liquidity == pytest.approx(float(features[-3]))
+
+
+@pytest.mark.asyncio
+async def test_ensemble_sessions_match_sklearn(valuation_service):
+    """Test that ONNX Runtime ensemble predictions match the sklearn estimators"""
+    rng = np.random.default_rng(0)
+    X = rng.random((200, 30)).astype(np.float32)
+    y = 1000 + 5000 * X[:, 0] + 2000 * X[:, 1]
+
+    for model in valuation_service.ensemble_model.values():
+        model.fit(X, y)
+    valuation_service.ensemble_sessions = valuation_service._build_ensemble_sessions()
+    valuation_service._scaler_mean = np.zeros(30, dtype=np.float32)
+    valuation_service._scaler_scale = np.ones(30, dtype=np.float32)
+
+    rows = rng.random((8, 30)).astype(np.float32)
+    predictions = valuation_service._predict_ensemble_batch(rows)
+
+    assert set(valuation_service.ensemble_sessions) == {"random_forest", "gradient_boosting"}
+    for model_name, model in valuation_service.ensemble_model.items():
+        expected = model.predict(rows)
+        actual = [row[model_name] for row in predictions]
+        assert np.allclose(actual, expected, rtol=1e-4)
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_updated_in_background(valuation_service):
+    """Test that queued metrics updates are applied without blocking the caller"""
+    features = np.random.rand(30).astype(np.float32)
+
+    for _ in range(3):
+        await valuation_service._record_metrics(1000.0, features)
+    await valuation_service._metrics_queue.join()
+
+    assert valuation_service.model_metrics["prediction_count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_market_data_cache_expires_entries():
+    """Test that market data is served from cache until its TTL passes"""
+    service = ValuationService()
+
+    first = await service._gather_market_data({"category": "music"})
+    assert await service._gather_market_data({"category": "music"}) is first
+
+    # Age the entry past its TTL
+    _, market_data = service.market_data_cache["music"]
+    service.market_data_cache["music"] = (time.monotonic() - 1, market_data)
+
+    refreshed = await service._gather_market_data({"category": "music"})
+    assert refreshed is not first
+    expires_at, cached = service.market_data_cache["music"]
+    assert cached is refreshed
+    assert expires_at > time.monotonic() + service._market_data_ttl - 60
+
+
+@pytest.mark.asyncio
+async def test_market_data_cache_evicts_least_recently_used():
+    """Test that the market data cache keeps at most its size, evicting the LRU category"""
+    service = ValuationService()
+    service._market_data_cache_size = 2
+
+    art = await service._gather_market_data({"category": "art"})
+    await service._gather_market_data({"category": "music"})
+    assert await service._gather_market_data({"category": "art"}) is art  # Now most recent
+    await service._gather_market_data({"category": "video"})
+
+    assert list(service.market_data_cache) == ["art", "video"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compile_model,train_bf16", [(False, False), (False, True), (True, False)])
+async def test_training_swaps_scaler_and_models_together(
+    valuation_service, monkeypatch, tmp_path, compile_model, train_bf16
+):
+    """Test that retraining installs a new scaler, estimators and sessions as one set"""
+    monkeypatch.chdir(tmp_path)  # _save_models writes to ./models
+    monkeypatch.setattr(settings, "valuation_compile_model", compile_model)
+    monkeypatch.setattr(settings, "valuation_train_bf16", train_bf16)
+
+    rng = np.random.default_rng(3)
+    training_data = [
+        {
+            "price": float(price),
+            "category": "music",
+            "quality_score": float(quality),
+            "creator_reputation": float(reputation),
+            "rarity": float(rarity),
+        }
+        for price, quality, reputation, rarity in zip(
+            rng.lognormal(8, 1, 60), rng.random(60), rng.random(60), rng.random(60)
+        )
+    ]
+    old_scaler = valuation_service.scaler
+    old_models = valuation_service.ensemble_model
+    old_inference_model = valuation_service.inference_model
+
+    await valuation_service.train_model_with_new_data(training_data)
+
+    X = np.zeros((len(training_data), 30), dtype=np.float32)
+    for row, record in zip(X, training_data):
+        valuation_service._write_features(row, record)
+    assert valuation_service.scaler is not old_scaler
+    assert np.allclose(valuation_service.scaler.mean_, X.mean(axis=0), atol=1e-5)
+    assert np.array_equal(valuation_service._scaler_mean, valuation_service.scaler.mean_.astype(np.float32))
+    assert valuation_service.inference_model is not old_inference_model
+
+    # The served sessions belong to the new estimators, not the ones they were cloned from
+    assert set(valuation_service.ensemble_sessions) == {"random_forest", "gradient_boosting"}
+    rows = rng.random((4, 30)).astype(np.float32)
+    predictions = valuation_service._predict_ensemble_batch(rows)
+    for model_name, model in valuation_service.ensemble_model.items():
+        assert model is not old_models[model_name]
+        expected = np.clip(model.predict(valuation_service._scale(rows)), 100, 1000000)
+        assert [row[model_name] for row in predictions] == pytest.approx(expected, rel=1e-4)
+
+    response = await valuation_service.estimate_value(
+        token_id=1,
+        metadata={"category": "music", "creator": "0x12", "quality_score": 0.9, "rarity": 0.8},
+    )
+    assert response.estimated_value > 0
+    assert (tmp_path / "models" / "scaler.joblib").exists()
@@ -0,0 +1,297 @@
+"""Tests for the vector database service"""
+
+import time
+
+import faiss
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from src.services.vector_db_service import VectorDBService
+
+
+@pytest_asyncio.fixture
+async def vector_db():
+    """Create an initialized vector database with random unit vectors"""
+    service = VectorDBService()
+    await service.initialize()
+
+    rng = np.random.default_rng(0)
+    for i in range(200):
+        await service.store_vector(f"content-{i}", rng.standard_normal(512).tolist(), {"i": i})
+    return service
+
+
+def brute_force_search(service, query, threshold, limit):
+    """Reference exact cosine search over the stored vectors"""
+    query = np.asarray(query, dtype=np.float64)
+    query = query / np.linalg.norm(query)
+    scored = [
+        (content_id, float(np.dot(query, vector)))
+        for content_id, vector in zip(service.ids, service.matrix)
+    ]
+    scored = [item for item in scored if item[1] >= threshold]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:limit]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("exact_search_max_rows", [10000, 0])
+async def test_search_similar_matches_brute_force(vector_db, exact_search_max_rows):
+    """Test that exact and HNSW search return the same top results as a reference scan"""
+    vector_db.exact_search_max_rows = exact_search_max_rows
+    query = (await vector_db.get_vector("content-7")).vector
+
+    results = await vector_db.search_similar(query, threshold=-1.0, limit=5)
+    expected = brute_force_search(vector_db, query, threshold=-1.0, limit=5)
+
+    assert [content_id for content_id, _, _ in results] == [content_id for content_id, _ in expected]
+    assert results[0][0] == "content-7"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert results[0][2] == {"i": 7}
+
+
+@pytest.mark.asyncio
+async def test_large_collections_switch_to_ivf_pq():
+    """Test that IVF-PQ is trained once past the row threshold and kept across rebuilds"""
+    service = VectorDBService()
+    await service.initialize()
+    service.exact_search_max_rows = 0
+    service.pq_min_rows = 2000
+    service.ivf_nlist = 16
+
+    rng = np.random.default_rng(5)
+    centers = rng.standard_normal((16, 512))
+    vectors = centers[np.arange(3000) % 16] + rng.standard_normal((3000, 512)) * 0.5
+    await service.batch_store([(f"content-{i}", vector, {"i": i}) for i, vector in enumerate(vectors)])
+
+    query = vectors[42]
+    # The first search starts training in the background and answers from HNSW
+    results = await service.search_similar(query, threshold=-1.0, limit=5)
+    assert isinstance(service.index, faiss.IndexHNSWFlat)
+    assert results[0][0] == "content-42"
+    await service._pq_training_task
+
+    results = await service.search_similar(query, threshold=-1.0, limit=5)
+    assert isinstance(service.index, faiss.IndexIVFPQ)
+    assert service.index.ntotal == service.count
+    assert results[0][0] == "content-42"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert [score for _, score, _ in results] == sorted((score for _, score, _ in results), reverse=True)
+
+    index = service.index
+    await service.delete_vector("content-42")
+    results = await service.search_similar(query, threshold=-1.0, limit=5)
+    assert service.index is index
+    assert service.index.ntotal == service.count == 2999
+    assert "content-42" not in [content_id for content_id, _, _ in results]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("write", ["append", "delete"])
+async def test_pq_index_trained_in_background_tracks_concurrent_writes(write):
+    """Test that rows appended or deleted while IVF-PQ trains are reflected once it is swapped in"""
+    service = VectorDBService()
+    await service.initialize()
+    service.exact_search_max_rows = 0
+    service.pq_min_rows = 2000
+    service.ivf_nlist = 16
+
+    rng = np.random.default_rng(6)
+    vectors = rng.standard_normal((2100, 512))
+    await service.batch_store([(f"content-{i}", vector, {}) for i, vector in enumerate(vectors)])
+    await service.search_similar(vectors[0], threshold=-1.0, limit=1)
+    training = service._pq_training_task
+
+    # The event loop stays free to take writes while the worker thread trains
+    if write == "append":
+        await service.store_vector("extra", vectors[7] + 0.01, {})
+    else:
+        await service.delete_vector("content-5")
+    await training
+    assert isinstance(service.index, faiss.IndexIVFPQ)
+
+    results = await service.search_similar(vectors[2050], threshold=-1.0, limit=1)
+    assert service.index.ntotal == service.count
+    assert results[0][0] == "content-2050"
+
+
+@pytest.mark.asyncio
+async def test_get_vector_returns_read_only_row_view(vector_db):
+    """Test that get_vector exposes the stored row without copying it"""
+    record = await vector_db.get_vector("content-4")
+
+    assert np.shares_memory(record.vector, vector_db.matrix)
+    assert not record.vector.flags.writeable
+    assert record.metadata == {"i": 4}
+
+
+@pytest.mark.asyncio
+async def test_vectors_are_normalized_in_float32(vector_db):
+    """Test that ingest and queries stay in float32 without changing results"""
+    vector = np.random.default_rng(4).standard_normal(300)
+
+    unit = vector_db._to_unit_vector(vector)
+
+    assert unit.dtype == np.float32
+    assert unit.shape == (512,)
+    assert np.allclose(unit[:300], vector / np.linalg.norm(vector), atol=1e-6)
+    assert not unit[300:].any()
+
+
+@pytest.mark.asyncio
+async def test_search_similar_applies_threshold(vector_db):
+    """Test that results below the similarity threshold are dropped"""
+    query = (await vector_db.get_vector("content-3")).vector
+
+    results = await vector_db.search_similar(query, threshold=0.9, limit=10)
+
+    assert [content_id for content_id, _, _ in results] == ["content-3"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("exact_search_max_rows", [10000, 0])
+async def test_search_similar_after_delete_and_overwrite(vector_db, exact_search_max_rows):
+    """Test that deleted and overwritten vectors are reflected in search"""
+    vector_db.exact_search_max_rows = exact_search_max_rows
+    query = np.array((await vector_db.get_vector("content-1")).vector)
+    await vector_db.delete_vector("content-1")
+    await vector_db.store_vector("content-2", query, {"i": 1})
+
+    results = await vector_db.search_similar(query, threshold=0.9, limit=10)
+
+    assert [(content_id, metadata) for content_id, _, metadata in results] == [("content-2", {"i": 1})]
+    assert vector_db.count == 199
+    assert await vector_db.get_vector("content-1") is None
+    assert vector_db.ids[vector_db.id_to_row["content-199"]] == "content-199"
+
+
+@pytest.mark.asyncio
+async def test_matrix_grows_and_reports_memory(vector_db):
+    """Test that vectors are stored as rows of one contiguous float32 matrix"""
+    assert vector_db.matrix.shape == (200, 512)
+    assert vector_db.matrix.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vector_db.matrix, axis=1), 1.0, atol=1e-5)
+
+    stats = await vector_db.get_stats()
+    assert stats["total_vectors"] == 200
+    assert stats["memory_usage_mb"] == pytest.approx(1024 * 512 * 4 / (1024 * 1024))
+
+
+@pytest.mark.asyncio
+async def test_find_duplicates_matches_pairwise_scan(vector_db):
+    """Test that blocked duplicate detection finds the same pairs as a pairwise scan"""
+    base = (await vector_db.get_vector("content-0")).vector
+    rng = np.random.default_rng(1)
+    for i in range(3):
+        near_copy = np.asarray(base) + rng.standard_normal(512) * 0.01
+        await vector_db.store_vector(f"copy-{i}", near_copy.tolist(), {})
+
+    duplicates = await vector_db.find_duplicates(threshold=0.95)
+
+    vectors, ids = vector_db.matrix, vector_db.ids
+    expected = [
+        (ids[i], ids[j])
+        for i in range(len(ids))
+        for j in range(i + 1, len(ids))
+        if np.dot(vectors[i], vectors[j]) >= 0.95
+    ]
+    assert [(id1, id2) for id1, id2, _ in duplicates] == expected
+    assert len(expected) == 6
+
+
+@pytest.mark.asyncio
+async def test_cluster_vectors_groups_every_vector():
+    """Test that k-means assigns each stored vector to exactly one cluster"""
+    service = VectorDBService()
+    await service.initialize()
+
+    rng = np.random.default_rng(2)
+    centers = rng.standard_normal((3, 512)) * 10
+    for i in range(90):
+        vector = centers[i % 3] + rng.standard_normal(512)
+        await service.store_vector(f"content-{i}", vector.tolist(), {})
+
+    clusters = await service.cluster_vectors(n_clusters=3)
+
+    assert sorted(clusters) == [0, 1, 2]
+    assert sorted(content_id for ids in clusters.values() for content_id in ids) == sorted(service.ids)
+    groups = {frozenset(int(content_id.split("-")[1]) % 3 for content_id in ids) for ids in clusters.values()}
+    assert groups == {frozenset([0]), frozenset([1]), frozenset([2])}
+
+
+@pytest.mark.asyncio
+async def test_batch_store_matches_sequential_store():
+    """Test that batch_store produces the same storage as repeated store_vector calls"""
+    rng = np.random.default_rng(3)
+    records = [
+        (f"content-{i % 40}", rng.standard_normal(int(rng.integers(400, 600))).tolist(), {"i": i})
+        for i in range(50)
+    ]
+    records.append(("zero", [0.0] * 512, {}))
+
+    sequential = VectorDBService()
+    await sequential.initialize()
+    for content_id, vector, metadata in records:
+        await sequential.store_vector(content_id, vector, metadata)
+
+    batched = VectorDBService()
+    await batched.initialize()
+    await batched.store_vector("content-3", [1.0] * 512, {"i": -1})
+    stored = await batched.batch_store(records)
+
+    assert stored == len(records)
+    assert sorted(batched.ids) == sorted(sequential.ids)
+    for content_id in sequential.ids:
+        expected = await sequential.get_vector(content_id)
+        actual = await batched.get_vector(content_id)
+        assert actual.metadata == expected.metadata
+        assert np.allclose(actual.vector, expected.vector, atol=1e-6)
+
+    query = batched.matrix[5]
+    assert (await batched.search_similar(query, threshold=0.99))[0][0] == batched.ids[5]
+
+
+@pytest.mark.asyncio
+async def test_record_timestamps_are_wall_clock_and_persisted(tmp_path):
+    """Test that stored and batch-stored records carry time.time() timestamps that survive save/load"""
+    service = VectorDBService()
+    await service.initialize()
+
+    before = time.time()
+    await service.store_vector("single", np.ones(512).tolist(), {})
+    await service.batch_store([("batched", np.arange(512, dtype=np.float64).tolist(), {})])
+    after = time.time()
+
+    await service.save(str(tmp_path))
+    loaded = VectorDBService()
+    await loaded.load(str(tmp_path))
+
+    for content_id in ("single", "batched"):
+        timestamp = (await loaded.get_vector(content_id)).timestamp
+        assert before <= timestamp <= after
+        assert timestamp == (await service.get_vector(content_id)).timestamp
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_memory_maps_vectors(vector_db, tmp_path):
+    """Test that a saved database loads as a read-only mapping and copies on first write"""
+    query = np.array((await vector_db.get_vector("content-9")).vector)
+    expected = await vector_db.search_similar(query, threshold=-1.0, limit=5)
+    await vector_db.save(str(tmp_path))
+
+    loaded = VectorDBService()
+    await loaded.load(str(tmp_path))
+
+    assert isinstance(loaded._buffer, np.memmap)
+    assert loaded.count == 200
+    assert await loaded.search_similar(query, threshold=-1.0, limit=5) == expected
+
+    loaded.exact_search_max_rows = 0
+    assert (await loaded.search_similar(query, threshold=-1.0, limit=1))[0][0] == "content-9"
+
+    await loaded.delete_vector("content-9")
+    assert not isinstance(loaded._buffer, np.memmap)
+    assert loaded.count == 199
+    assert await loaded.get_vector("content-9") is None
+    assert np.array_equal((await loaded.get_vector("content-3")).vector, (await vector_db.get_vector("content-3")).vector)
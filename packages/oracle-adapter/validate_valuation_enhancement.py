@@ -6,6 +6,28 @@ import os
 import sys
 
 
+def collect_identifiers(tree):
+    """Return the identifiers used in code and the top-level modules imported, in one walk"""
+    names = set()
+    imports = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Attribute):
+            names.add(node.attr)
+        elif isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.keyword) and node.arg:
+            names.add(node.arg)
+        elif isinstance(node, ast.Import):
+            imports.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module:
+                imports.add(node.module.split('.')[0])
+            names.update(alias.asname or alias.name for alias in node.names)
+    return names, imports
+
+
 def validate_valuation_service():
     """Validate the enhanced valuation service implementation"""
     
@@ -22,11 +44,9 @@ def validate_valuation_service():
     
     # Read and parse the file
     try:
-        with open(valuation_file, 'r') as f:
-            content = f.read()
-        
-        # Parse the AST to validate structure
-        tree = ast.parse(content)
+        # Parse the AST straight from bytes; the checks below only need the tree
+        with open(valuation_file, 'rb') as f:
+            tree = ast.parse(f.read(), filename=valuation_file)
         
     except Exception as e:
         print(f"❌ Failed to parse valuation service file: {e}")
@@ -73,11 +93,29 @@ def validate_valuation_service():
         ],
         "Comparable Sales": [
             "_find_enhanced_comparable_sales",
-            "_calculate_similarity_score",
+            "_calculate_similarity_scores",
             "_fetch_external_comparable_sales",
         ],
     }
     
+    ml_imports = [
+        "torch",
+        "sklearn",
+        "pandas",
+        "joblib",
+        "numpy",
+    ]
+    
+    enhanced_methods = [
+        ("estimate_value", "model_uncertainty"),
+        ("_run_neural_model", "Tuple[float, float]"),
+        ("_combine_predictions", "confidence weighting"),
+        ("_calculate_enhanced_confidence_interval", "multiple uncertainty sources"),
+    ]
+    
+    # Identifiers defined or used in code; names that only appear in strings or comments don't count
+    names, imports = collect_identifiers(tree)
+    
     print("\n🔧 Checking Implementation Enhancements:")
     print("-" * 40)
     
@@ -88,7 +126,7 @@ def validate_valuation_service():
         
         enhancement_passed = True
         for item in required_items:
-            if item in content:
+            if item in names:
                 print(f"  ✅ {item}")
             else:
                 print(f"  ❌ {item} - Missing")
@@ -104,16 +142,8 @@ def validate_valuation_service():
     print(f"\n📦 Checking ML Dependencies:")
     print("-" * 30)
     
-    ml_imports = [
-        "torch",
-        "sklearn",
-        "pandas",
-        "joblib",
-        "numpy",
-    ]
-    
     for import_name in ml_imports:
-        if f"import {import_name}" in content or f"from {import_name}" in content:
+        if import_name in imports:
             print(f"  ✅ {import_name}")
         else:
             print(f"  ❌ {import_name} - Missing import")
@@ -122,15 +152,8 @@ def validate_valuation_service():
     print(f"\n🔧 Checking Enhanced Method Signatures:")
     print("-" * 40)
     
-    enhanced_methods = [
-        ("estimate_value", "model_uncertainty"),
-        ("_run_neural_model", "Tuple[float, float]"),
-        ("_combine_predictions", "confidence weighting"),
-        ("_calculate_enhanced_confidence_interval", "multiple uncertainty sources"),
-    ]
-    
     for method_name, expected_feature in enhanced_methods:
-        if method_name in content:
+        if method_name in names:
             print(f"  ✅ {method_name} method found")
         else:
             print(f"  ❌ {method_name} method missing")
@@ -150,11 +173,11 @@ def validate_valuation_service():
     # Check schemas file
     schemas_file = "src/models/schemas.py"
     if os.path.exists(schemas_file):
-        with open(schemas_file, 'r') as f:
+        with open(schemas_file, 'rb') as f:
             schemas_content = f.read()
-        
+        schema_hits = {field: field.encode() in schemas_content for field in response_fields}
         for field in response_fields:
-            if field in schemas_content:
+            if schema_hits[field]:
                 print(f"  ✅ {field}")
             else:
                 print(f"  ❌ {field} - Missing from schema")